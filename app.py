@@ -5,12 +5,14 @@ import os
 #                   delete_index, delete_files_from_index, get_document_content_by_id,
 #                   run_llm_on_index, delete_document_by_id, create_sources_string)
 
+import ingest_jobs
 import utils
 
 
 def main():
     """Función principal de la aplicación"""
     st.set_page_config(layout="wide")
+    utils.start_metrics_server()
 
     # Crear la carpeta docs si no existe
     if not os.path.exists("docs"):
@@ -52,7 +54,7 @@ def main():
                     st.session_state.chat_histories[idx['name']] = {
                         "user_prompt_history": [],
                         "chat_answers_history": [],
-                        "chat_history": [],
+                        "chat_history": utils.new_chat_history(),
                         "used_fragments": {}
                     }
                 st.rerun()
@@ -77,7 +79,7 @@ def show_create_index_page():
     if not is_valid_name:
         st.warning("El nombre del asistente debe contener solo letras minúsculas, números o guiones '-'")
 
-    files = st.file_uploader("Subir documentos", type=["pdf", "docx", "txt", "md"],
+    files = st.file_uploader("Subir documentos", type=["pdf", "docx", "txt", "md", "html"],
                           accept_multiple_files=True, key="file_uploader")
 
     if files:
@@ -101,21 +103,13 @@ def show_create_index_page():
                         f.write(file.getbuffer())
                     saved_files.append(file_path)
 
-                with st.spinner("Procesando documentos..."):
-                    result = utils.ingest_docs(uploaded_files=files, index_name=index_name, assistant_id="5")
-                    if result:
-                        st.success(f"¡asistente '{index_name}' creado correctamente!")
-                        st.info(f"Los documentos se han guardado en: {docs_dir}")
+                # Ingerir en segundo plano: el progreso se muestra abajo y sobrevive a recargas de la página
+                ingest_jobs.submit_job(index_name, saved_files, assistant_id="5",
+                                       file_types={file.name: file.type for file in files})
+                st.success(f"Creando el asistente '{index_name}' en segundo plano")
+                st.info(f"Los documentos se han guardado en: {docs_dir}")
 
-                        # Mostrar lista de archivos guardados
-                        with st.expander("Archivos guardados"):
-                            for file in files:
-                                st.write(file.name)
-
-                        # Actualizar la lista de asistentes
-                        st.rerun()
-                    else:
-                        st.error("Error al procesar los documentos")
+    show_ingest_jobs(index_name)
 
 def show_index_page(index_name):
     """Muestra la página de un asistente específico con pestañas"""
@@ -127,7 +121,7 @@ def show_index_page(index_name):
         st.session_state.chat_histories[index_name] = {
             "user_prompt_history": [],
             "chat_answers_history": [],
-            "chat_history": [],
+            "chat_history": utils.new_chat_history(),
             "used_fragments": {}
         }
     chat_state = st.session_state.chat_histories[index_name]
@@ -151,18 +145,23 @@ def show_chatbot_tab(index_name, chat_state):
         st.session_state.current_prompt = None
     if "message_sources" not in st.session_state:
         st.session_state.message_sources = {}
+    if "message_timings" not in st.session_state:
+        st.session_state.message_timings = {}
 
     # Botón para reiniciar conversación
     if st.button("🔄 Reiniciar conversación", key="reset_chat"):
         chat_state["user_prompt_history"] = []
         chat_state["chat_answers_history"] = []
-        chat_state["chat_history"] = []
+        chat_state["chat_history"] = utils.new_chat_history()
         chat_state["used_fragments"] = {}
         st.session_state.message_sources = {}
+        st.session_state.message_timings = {}
         st.session_state.is_processing = False
         st.session_state.current_prompt = None
         st.rerun()
 
+    show_stage_timings = st.toggle("⏱️ Desglose de tiempos por etapa", key="show_stage_timings")
+
     # Área de mensajes con scroll
     chat_messages = st.container(height=600)
     with chat_messages:
@@ -183,8 +182,15 @@ def show_chatbot_tab(index_name, chat_state):
             with st.chat_message("assistant"):
                 st.markdown(clean_response)
 
-                # Mostrar fuentes para este mensaje específico
+                # Mostrar tiempos de respuesta de este mensaje
                 message_id = f"msg_{i}"
+                timings = st.session_state.message_timings.get(message_id)
+                if timings:
+                    st.caption(f"⏱️ Primer token: {timings['ttft'] or 0:.2f}s · Total: {timings['total']:.2f}s")
+                    if show_stage_timings and timings.get("spans"):
+                        show_stage_timings_panel(timings["spans"])
+
+                # Mostrar fuentes para este mensaje específico
                 if message_id in st.session_state.message_sources and st.session_state.message_sources[message_id]:
                     st.markdown("**Fuentes utilizadas:**")
 
@@ -217,47 +223,63 @@ def show_chatbot_tab(index_name, chat_state):
         if st.session_state.is_processing and st.session_state.current_prompt:
             st.chat_message("user").write(st.session_state.current_prompt)
             with st.chat_message("assistant"):
-                with st.spinner("Pensando..."):
-                    # Generar respuesta
-                    generated_response = utils.run_llm_on_index(
+                status = st.empty()
+                status.caption("Pensando...")
+                generated_response = {}
+
+                def answer_tokens():
+                    # Generar respuesta en streaming
+                    for event in utils.stream_llm_on_index(
                         query=st.session_state.current_prompt,
                         chat_history=chat_state["chat_history"],
                         index_name=index_name
-                    )
-
-                    # Crear un ID para este mensaje
-                    message_id = f"msg_{len(chat_state['user_prompt_history'])}"
-                    st.session_state.message_sources[message_id] = {}
-
-                    # Guardar fuentes específicas para este mensaje
-                    if "source_documents" in generated_response and generated_response["source_documents"]:
-                        for doc in generated_response["source_documents"]:
-                            if hasattr(doc, "metadata") and "filename" in doc.metadata:
-                                fragment_key = f"{doc.metadata.get('filename')}_{doc.page_content[:30]}"
-                                # Guardar en el historial general
-                                if "used_fragments" not in chat_state:
-                                    chat_state["used_fragments"] = {}
-                                if fragment_key not in chat_state["used_fragments"]:
-                                    chat_state["used_fragments"][fragment_key] = {
-                                        "content": doc.page_content,
-                                        "metadata": doc.metadata
-                                    }
-                                # Guardar para este mensaje específico
-                                st.session_state.message_sources[message_id][fragment_key] = {
+                    ):
+                        if event["type"] == "sources":
+                            status.caption(f"{len(event['source_documents'])} fragmentos recuperados. Generando respuesta...")
+                        elif event["type"] == "token":
+                            yield event["content"]
+                        elif event["type"] == "done":
+                            generated_response.update(event)
+
+                st.write_stream(answer_tokens())
+                status.empty()
+
+                # Crear un ID para este mensaje
+                message_id = f"msg_{len(chat_state['user_prompt_history'])}"
+                st.session_state.message_sources[message_id] = {}
+                st.session_state.message_timings[message_id] = {
+                    **generated_response["timings"],
+                    "spans": generated_response.get("spans", [])
+                }
+
+                # Guardar fuentes específicas para este mensaje
+                if "source_documents" in generated_response and generated_response["source_documents"]:
+                    for doc in generated_response["source_documents"]:
+                        if hasattr(doc, "metadata") and "filename" in doc.metadata:
+                            fragment_key = f"{doc.metadata.get('filename')}_{doc.page_content[:30]}"
+                            # Guardar en el historial general
+                            if "used_fragments" not in chat_state:
+                                chat_state["used_fragments"] = {}
+                            if fragment_key not in chat_state["used_fragments"]:
+                                chat_state["used_fragments"][fragment_key] = {
                                     "content": doc.page_content,
                                     "metadata": doc.metadata
                                 }
-
-                    # Actualizar historial
-                    chat_state["user_prompt_history"].append(st.session_state.current_prompt)
-                    chat_state["chat_answers_history"].append(generated_response['result'])
-                    chat_state["chat_history"].append(("human", st.session_state.current_prompt))
-                    chat_state["chat_history"].append(("ai", generated_response["result"]))
-
-                    # Finalizar procesamiento
-                    st.session_state.is_processing = False
-                    st.session_state.current_prompt = None
-                    st.rerun()
+                            # Guardar para este mensaje específico
+                            st.session_state.message_sources[message_id][fragment_key] = {
+                                "content": doc.page_content,
+                                "metadata": doc.metadata
+                            }
+
+                # Actualizar historial
+                chat_state["user_prompt_history"].append(st.session_state.current_prompt)
+                chat_state["chat_answers_history"].append(generated_response['result'])
+                chat_state["chat_history"].add_turn(st.session_state.current_prompt, generated_response["result"])
+
+                # Finalizar procesamiento
+                st.session_state.is_processing = False
+                st.session_state.current_prompt = None
+                st.rerun()
 
     # Input para nuevos mensajes
     prompt = st.chat_input("Haz una pregunta sobre los documentos...")
@@ -278,6 +300,8 @@ def show_chatbot_tab(index_name, chat_state):
                     expander_title = ""
                     if "metadata" in fragment and "page" in fragment["metadata"]:
                         expander_title = f"Page {int(fragment['metadata']['page'])} --- "
+                    elif fragment.get("metadata", {}).get("heading"):
+                        expander_title = f"{fragment['metadata']['heading'][:60]} --- "
                     expander_title += fragment['content'][:90] + "..."
 
                     with st.expander(expander_title, expanded=(idx == 0)):
@@ -301,6 +325,11 @@ def show_info_tab(index_name):
         indices = utils.get_all_indexes(detailed=True)
         index_details = next((idx for idx in indices if idx['name'] == index_name), None)
         if index_details:
+            # Número real de vectores según las estadísticas del índice
+            stats = utils.get_index_stats(index_name)
+            if stats:
+                index_details["vectores"] = stats["vector_count"]
+                index_details["namespaces"] = len(stats["namespaces"])
             display_details = {}
             for key, value in index_details.items():
                 if isinstance(value, (dict, list, tuple)) or not isinstance(value, (str, int, float, bool, type(None))):
@@ -331,22 +360,14 @@ def show_info_tab(index_name):
                         st.error("Error al eliminar el asistente")
                         st.session_state.confirm_delete_index = False
 
+    show_assistant_settings(index_name)
+    show_ingest_jobs(index_name)
+
     st.subheader("Documentos en este asistente")
 
     with st.spinner("Cargando documentos..."):
-        docs = utils.get_docs_by_index(index_name, limit=100)
-        files_info = {}
-        for doc in docs:
-            if hasattr(doc, "metadata") and "filename" in doc.metadata:
-                filename = doc.metadata.get("filename", "Desconocido")
-                source_path = doc.metadata.get("source", None)
-                if filename not in files_info:
-                    files_info[filename] = {
-                        "count": 0,
-                        "metadata": doc.metadata.copy(),
-                        "file_path": source_path
-                    }
-                files_info[filename]["count"] += 1
+        # Archivos y chunks según el manifiesto del índice
+        files_info = utils.get_index_files(index_name)
 
         if not files_info:
             st.info("No se encontraron documentos en este asistente")
@@ -356,34 +377,15 @@ def show_info_tab(index_name):
         df_col, selector_col = st.columns([3, 2])
 
         with df_col:
-            # Obtener conteo completo de chunks aumentando significativamente el límite
-            docs = utils.get_docs_by_index(index_name, limit=10000)  # Aumentado de 100 a 10000
-
-            # Reinicializar files_info para no duplicar con el cálculo previo
-            files_info = {}
-            for doc in docs:
-                if hasattr(doc, "metadata") and "filename" in doc.metadata:
-                    filename = doc.metadata.get("filename", "Desconocido")
-                    source_path = doc.metadata.get("source", None)
-                    if filename not in files_info:
-                        files_info[filename] = {
-                            "count": 0,
-                            "metadata": doc.metadata.copy(),
-                            "file_path": source_path
-                        }
-                    files_info[filename]["count"] += 1
-
-            # Advertir si se alcanzó el límite
-            if len(docs) >= 10000:
-                st.warning("⚠️ Es posible que no se muestren todos los chunks debido al límite de consulta (10.000).")
-
             file_data = []
             for filename, info in files_info.items():
                 file_ext = filename.split('.')[-1].upper() if '.' in filename else "DESCONOCIDO"
                 file_data.append({
                     "Archivo": filename,
                     "Tipo": file_ext,
-                    "Chunks": info["count"]  # Cambiado de "fuentes" a "Chunks" para mayor claridad
+                    "Chunks": info["chunk_count"],
+                    "Tamaño (KB)": round(info["size"] / 1024, 1) if info.get("size") else None,
+                    "Ingestado": info.get("ingested_at")
                 })
 
             # Ordenar por nombre de archivo
@@ -391,6 +393,12 @@ def show_info_tab(index_name):
 
             st.dataframe(pd.DataFrame(file_data), hide_index=True, height=300)
 
+            stats = utils.get_index_stats(index_name)
+            if stats:
+                manifest_chunks = sum(info["chunk_count"] for info in files_info.values())
+                st.caption(f"{stats['vector_count']} vectores en el índice "
+                           f"({manifest_chunks} fragmentos registrados en el manifiesto)")
+
         with selector_col:
             if "selected_file" not in st.session_state:
                 st.session_state.selected_file = None
@@ -402,9 +410,7 @@ def show_info_tab(index_name):
             st.session_state.selected_file = selected_file
 
             if selected_file:
-                file_info = files_info[selected_file]
                 possible_paths = [
-                    file_info.get("file_path"),
                     os.path.join("docs", index_name, selected_file),
                     os.path.join("docs", selected_file)
                 ]
@@ -461,12 +467,10 @@ def show_info_tab(index_name):
 
 
         if selected_file:
-            file_info = files_info[selected_file]
             file_ext = selected_file.lower().split('.')[-1] if '.' in selected_file else ''
             st.subheader(f"Visualización de {selected_file}")
 
             possible_paths = [
-                file_info.get("file_path"),
                 os.path.join("docs", index_name, selected_file),
                 os.path.join("docs", selected_file)
             ]
@@ -506,30 +510,127 @@ def show_info_tab(index_name):
             else:
                 st.warning("No se pudo encontrar el archivo original.")
                 st.info("Mostrando fuentes indexados como alternativa.")
-                fragments = [d for d in docs if hasattr(d, "metadata") and d.metadata.get("filename") == selected_file]
-                if fragments:
+                fragments = utils.get_document_content_by_id(index_name, selected_file)
+                if isinstance(fragments, list) and fragments:
                     for i, fragment in enumerate(fragments[:5]):
                         with st.expander(f"fuente {i+1} de {len(fragments)}", expanded=(i == 0)):
-                            st.code(fragment.page_content)
+                            st.code(fragment["content"])
                     if len(fragments) > 5:
                         st.info(f"Mostrando 5 de {len(fragments)} fuentes disponibles.")
 
 
 
 
+def show_stage_timings_panel(spans):
+    """Muestra el desglose por etapas de una respuesta"""
+    rows = [
+        {
+            "Etapa": span["name"],
+            "Tiempo (ms)": round(span["seconds"] * 1000, 1),
+            "Tokens": span.get("tokens"),
+            "Fragmentos": span.get("chunks")
+        }
+        for span in spans
+    ]
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+
+
+def show_assistant_settings(index_name):
+    """Muestra la configuración editable del asistente"""
+    with st.expander("⚙️ Configuración del asistente"):
+        config = utils.get_assistant_config(index_name)
+
+        hybrid_search = st.toggle(
+            "Búsqueda híbrida (BM25 + semántica)",
+            value=config["hybrid_search"],
+            help="Combina la búsqueda por palabras clave con la semántica: encuentra mejor fórmulas, artículos y nombres propios.",
+            key=f"hybrid_search_{index_name}"
+        )
+        retrieval_k = st.number_input(
+            "Fragmentos por respuesta",
+            min_value=1, max_value=10,
+            value=int(config["retrieval_k"]),
+            key=f"retrieval_k_{index_name}"
+        )
+        fetch_k = st.number_input(
+            "Candidatos por búsqueda",
+            min_value=1, max_value=100,
+            value=int(config["fetch_k"]),
+            help="Fragmentos que se recuperan antes de diversificar y quedarse con los mejores.",
+            key=f"fetch_k_{index_name}"
+        )
+        mmr = st.toggle(
+            "Diversificar fragmentos (MMR)",
+            value=config["mmr"],
+            help="Evita pasar al modelo fragmentos casi duplicados.",
+            key=f"mmr_{index_name}"
+        )
+        mmr_lambda = st.slider(
+            "Relevancia frente a diversidad",
+            min_value=0.0, max_value=1.0, step=0.05,
+            value=float(config["mmr_lambda"]),
+            disabled=not mmr,
+            key=f"mmr_lambda_{index_name}"
+        )
+        rerank = st.toggle(
+            "Reordenar candidatos por términos de la pregunta",
+            value=config["rerank"],
+            key=f"rerank_{index_name}"
+        )
+
+        semantic_cache = st.toggle(
+            "Caché semántica de respuestas",
+            value=config["semantic_cache"],
+            help="Reutiliza la respuesta de preguntas casi idénticas que recuperan el mismo contexto.",
+            key=f"semantic_cache_{index_name}"
+        )
+        threshold = st.slider(
+            "Umbral de similitud",
+            min_value=0.80, max_value=1.00, step=0.01,
+            value=float(config["semantic_cache_threshold"]),
+            disabled=not semantic_cache,
+            key=f"semantic_cache_threshold_{index_name}"
+        )
+
+        changes = {}
+        if hybrid_search != config["hybrid_search"]:
+            changes["hybrid_search"] = hybrid_search
+        if retrieval_k != config["retrieval_k"]:
+            changes["retrieval_k"] = retrieval_k
+        if fetch_k != config["fetch_k"]:
+            changes["fetch_k"] = fetch_k
+        if mmr != config["mmr"]:
+            changes["mmr"] = mmr
+        if mmr_lambda != config["mmr_lambda"]:
+            changes["mmr_lambda"] = mmr_lambda
+        if rerank != config["rerank"]:
+            changes["rerank"] = rerank
+        if semantic_cache != config["semantic_cache"]:
+            changes["semantic_cache"] = semantic_cache
+        if threshold != config["semantic_cache_threshold"]:
+            changes["semantic_cache_threshold"] = threshold
+        if changes:
+            utils.update_assistant_config(index_name, **changes)
+
+        stats = utils.get_semantic_cache_stats(index_name)
+        if semantic_cache and stats:
+            st.caption(f"Caché: {stats['hits']} aciertos, {stats['misses']} fallos, {stats['entries']} respuestas guardadas")
+
+        rephrase_stats = utils.get_rephrase_stats()
+        if rephrase_stats["total"]:
+            paths = ", ".join(f"{path}: {count}" for path, count in rephrase_stats["counts"].items())
+            st.caption(f"Reformulación de preguntas ({rephrase_stats['total']}): {paths}")
+
+
 def add_documents_uploader(index_name):
-    files = st.file_uploader("Añadir documentos", type=["pdf", "docx", "txt", "md"],
+    files = st.file_uploader("Añadir documentos", type=["pdf", "docx", "txt", "md", "html"],
                              accept_multiple_files=True, key="file_uploader")
 
     if files:
         if st.button("Añadir documentos al asistente", use_container_width=True):
             with st.spinner("Verificando documentos..."):
                 # Obtener documentos existentes en el asistente
-                docs = utils.get_docs_by_index(index_name, limit=100)
-                existing_filenames = set()
-                for doc in docs:
-                    if hasattr(doc, "metadata") and "filename" in doc.metadata:
-                        existing_filenames.add(doc.metadata.get("filename"))
+                existing_filenames = set(utils.get_index_files(index_name))
 
                 # Verificar duplicados
                 duplicate_files = [file for file in files if file.name in existing_filenames]
@@ -549,32 +650,90 @@ def add_documents_uploader(index_name):
                     os.makedirs(docs_dir)
 
                 # Guardar solo los archivos no duplicados
+                saved_files = []
                 for file in new_files:
                     file_path = os.path.join(docs_dir, file.name)
                     with open(file_path, "wb") as f:
                         f.write(file.getbuffer())
+                    saved_files.append(file_path)
 
-                # Procesar los documentos y añadirlos al asistente existente
-                result = utils.ingest_docs(
-                    uploaded_files=new_files,
-                    assistant_id="5",
-                    index_name=index_name,
-                    delete_existing_files=False
-                )
-
-                if result:
-                    st.success(f"{len(new_files)} documentos añadidos al asistente '{index_name}' correctamente")
-                    # Limpiar caché y recargar la página
+                # Procesar los documentos en segundo plano (ver el progreso en la pestaña de información)
+                if saved_files:
+                    ingest_jobs.submit_job(index_name, saved_files, assistant_id="5",
+                                           file_types={file.name: file.type for file in new_files})
                     st.cache_data.clear()
-                    import time
-                    time.sleep(1)
-                    st.rerun()
-                else:
-                    st.error("Error al procesar los documentos")
 
                 st.rerun()
 
 
+INGEST_JOB_STATUS = {
+    ingest_jobs.QUEUED: "⏳ En cola",
+    ingest_jobs.RUNNING: "⚙️ Procesando",
+    ingest_jobs.COMPLETED: "✅ Completado",
+    ingest_jobs.FAILED: "❌ Fallido",
+    ingest_jobs.CANCELLED: "⏹️ Cancelado",
+    ingest_jobs.INTERRUPTED: "⚠️ Interrumpido",
+}
+
+
+def show_ingest_job(job):
+    """Muestra el estado y el progreso por archivo de un trabajo de ingesta"""
+    with st.container(border=True):
+        status_col, actions_col = st.columns([3, 1])
+        with status_col:
+            last_batch = job["last_batch"]
+            st.markdown(f"**{INGEST_JOB_STATUS.get(job['status'], job['status'])}** · "
+                        f"{len(job['files'])} archivos · {job['batches_done']} lotes subidos")
+            if last_batch:
+                st.caption(f"Último lote: {last_batch['number']} ({last_batch['chunks']} fragmentos) a las {last_batch['at']}")
+            if job["error"]:
+                st.caption(f"Error: {job['error']}")
+
+        with actions_col:
+            if job["status"] in ingest_jobs.ACTIVE_STATES:
+                if st.button("Cancelar", key=f"cancel_job_{job['id']}", use_container_width=True):
+                    ingest_jobs.cancel_job(job["id"])
+                    st.rerun()
+            else:
+                if job["status"] in ingest_jobs.RESUMABLE_STATES:
+                    if st.button("Reanudar", key=f"resume_job_{job['id']}", use_container_width=True):
+                        ingest_jobs.resume_job(job["id"])
+                        st.rerun()
+                if st.button("Ocultar", key=f"delete_job_{job['id']}", use_container_width=True):
+                    ingest_jobs.delete_job(job["id"])
+                    st.rerun()
+
+        for filename, file_progress in job["progress"].items():
+            parsed = file_progress["chunks_parsed"]
+            upserted = file_progress["chunks_upserted"]
+            if file_progress["status"] == "completado":
+                value = 1.0
+            else:
+                value = min(upserted / parsed, 1.0) if parsed else 0.0
+            st.progress(value, text=f"{filename}: {upserted} de {parsed} fragmentos subidos ({file_progress['status']})")
+
+
+def show_ingest_jobs(index_name):
+    """Muestra los trabajos de ingesta del asistente, actualizándose mientras haya alguno activo"""
+    jobs = ingest_jobs.list_jobs(index_name)
+    if not jobs:
+        return
+    active = any(job["status"] in ingest_jobs.ACTIVE_STATES for job in jobs)
+
+    @st.fragment(run_every=1 if active else None)
+    def jobs_panel():
+        current_jobs = ingest_jobs.list_jobs(index_name)
+        if active and not any(job["status"] in ingest_jobs.ACTIVE_STATES for job in current_jobs):
+            # Al terminar, recargar toda la página (lista de asistentes y documentos)
+            st.rerun()
+
+        st.subheader("Procesamiento de documentos")
+        for job in current_jobs[:5]:
+            show_ingest_job(job)
+
+    jobs_panel()
+
+
 
 
 
@@ -0,0 +1,68 @@
+import json
+import os
+import threading
+
+from manifest import DOCS_DIR
+from storage import atomic_write_json
+
+# Configuración por asistente, guardada junto a sus documentos
+CONFIG_FILENAME = ".assistant.json"
+
+DEFAULT_CONFIG = {
+    # Recuperación: fragmentos que se pasan al modelo y candidatos por búsqueda
+    "retrieval_k": 3,
+    "fetch_k": 20,
+    # Búsqueda híbrida: BM25 local + búsqueda densa fusionadas con RRF
+    "hybrid_search": True,
+    # Diversificación MMR de los candidatos (1 = solo relevancia, 0 = solo diversidad)
+    "mmr": True,
+    "mmr_lambda": 0.7,
+    # Reordenación local combinando similitud coseno y cobertura de términos
+    "rerank": False,
+    # Caché semántica de respuestas (opcional)
+    "semantic_cache": False,
+    "semantic_cache_threshold": 0.95,
+    "semantic_cache_ttl": 24 * 3600,
+    "semantic_cache_max_entries": 500,
+}
+
+_lock = threading.Lock()
+
+
+def config_path(index_name: str) -> str:
+    return os.path.join(DOCS_DIR, index_name, CONFIG_FILENAME)
+
+
+def get_config(index_name: str) -> dict:
+    """
+    Devuelve la configuración del asistente, completada con los valores por defecto.
+    """
+    path = config_path(index_name)
+    with _lock:
+        stored = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+    return {**DEFAULT_CONFIG, **stored}
+
+
+def update_config(index_name: str, **changes) -> dict:
+    """
+    Actualiza (y persiste) parte de la configuración del asistente.
+
+    Returns:
+        dict: La configuración completa resultante.
+    """
+    unknown = set(changes) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"Opciones de configuración desconocidas: {', '.join(sorted(unknown))}")
+
+    path = config_path(index_name)
+    with _lock:
+        stored = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        stored.update(changes)
+        atomic_write_json(path, stored)
+    return {**DEFAULT_CONFIG, **stored}
@@ -0,0 +1,102 @@
+"""
+Responde un lote de preguntas sobre un asistente desde la línea de comandos.
+
+Lee un JSONL con una pregunta por línea, las responde de forma concurrente con
+`utils.run_llm_batch` y escribe un JSONL con un resultado por pregunta, en el
+mismo orden.
+
+Cada línea de entrada es un objeto con la pregunta en "query" y, opcionalmente,
+el historial en "chat_history" (lista de pares [rol, texto]) y un "id" que se
+copia en la salida:
+
+    {"id": "t1-3", "query": "¿Qué dice el artículo 14?"}
+    {"query": "¿Y el siguiente?", "chat_history": [["human", "¿Qué dice el artículo 14?"], ["ai", "..."]]}
+
+Uso:
+    python batch_qa_cli.py mi-asistente --input preguntas.jsonl --output respuestas.jsonl
+    cat preguntas.jsonl | python batch_qa_cli.py mi-asistente --concurrency 16 > respuestas.jsonl
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+import utils
+
+logger = logging.getLogger("batch_qa_cli")
+
+
+def read_questions(stream) -> list:
+    questions = []
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise SystemExit(f"Línea {line_number}: JSON no válido ({e})")
+        if not isinstance(item, dict) or not item.get("query"):
+            raise SystemExit(f"Línea {line_number}: falta la pregunta en \"query\"")
+        item["chat_history"] = [tuple(message) for message in item.get("chat_history") or []]
+        questions.append(item)
+    return questions
+
+
+def to_record(question: dict, result: dict) -> dict:
+    """
+    Convierte el resultado de una pregunta en una línea de salida serializable.
+    """
+    record = {"id": question["id"]} if "id" in question else {}
+    record.update({
+        "query": question["query"],
+        "result": result.get("result"),
+        "sources": [
+            {"id": doc.id, "filename": doc.metadata.get("filename"), "page": doc.metadata.get("page")}
+            for doc in result.get("source_documents", [])
+        ],
+        "timings": result.get("timings"),
+        "cached": result.get("cached", False),
+        "context_tokens": result.get("context_tokens", 0),
+        "error": result.get("error"),
+    })
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Responde un lote de preguntas (JSONL) sobre un asistente")
+    parser.add_argument("index", help="Nombre del asistente (índice)")
+    parser.add_argument("--input", default=None, help="JSONL de preguntas (por defecto, entrada estándar)")
+    parser.add_argument("--output", default=None, help="JSONL de respuestas (por defecto, salida estándar)")
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help=f"Preguntas en curso a la vez (por defecto {utils.BATCH_QA_CONCURRENCY})")
+    parser.add_argument("--model", default=utils.CHAT_MODEL)
+    parser.add_argument("--temperature", type=float, default=0)
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            questions = read_questions(f)
+    else:
+        questions = read_questions(sys.stdin)
+
+    start = time.perf_counter()
+    results = utils.run_llm_batch(questions, args.index, max_concurrency=args.concurrency,
+                                  model=args.model, temperature=args.temperature)
+    seconds = time.perf_counter() - start
+
+    lines = [json.dumps(to_record(question, result), ensure_ascii=False) + "\n"
+             for question, result in zip(questions, results)]
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+    else:
+        sys.stdout.writelines(lines)
+
+    errors = sum(1 for result in results if result.get("error"))
+    logger.info(f"{len(questions)} preguntas respondidas en {seconds:.1f}s ({errors} con error)")
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
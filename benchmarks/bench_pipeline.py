@@ -0,0 +1,345 @@
+"""
+Benchmark sin conexión de la ingesta (`utils.ingest_docs`) y de las consultas
+(`utils.stream_llm_on_index`).
+
+Ejecuta ambas funciones de principio a fin con embeddings deterministas
+falsos, un modelo de chat falso y el backend local de vectores en una carpeta
+temporal, sobre un corpus sintético (PDF/TXT/MD) de tamaño configurable.
+Mide chunks/s, pico de memoria (RSS), latencias p50/p95 de las consultas y el
+desglose por etapas, y guarda los resultados en JSON.
+
+Los archivos Markdown son opcionales (`--md-files`): `unstructured` necesita
+descargar un modelo de spaCy la primera vez, lo que requiere conexión.
+
+Uso:
+    python benchmarks/bench_pipeline.py --pdf-files 4 --pages 50 --txt-files 4 --md-files 2 --queries 50
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/baseline.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# utils crea los clientes de OpenAI al importarse; el benchmark los sustituye por falsos
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings  # noqa: E402
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+
+import utils  # noqa: E402
+from embedding_cache import CachedEmbeddings  # noqa: E402
+from vector_backends import LocalBackend, VectorBackend  # noqa: E402
+
+INDEX_NAME = "bench"
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+VOCABULARY = (
+    "célula membrana energía fotosíntesis mitocondria proteína enzima ecuación derivada integral "
+    "matriz vector teorema función límite artículo ley constitución tribunal contrato sentencia "
+    "revolución imperio tratado economía mercado inflación demanda oferta algoritmo complejidad "
+    "grafo memoria proceso sistema red protocolo"
+).split()
+
+
+class SyntheticFile(io.BytesIO):
+    """
+    Archivo en memoria con la interfaz de UploadedFile que usa `ingest_docs`.
+    """
+
+    def __init__(self, name: str, data: bytes, type: str):
+        super().__init__(data)
+        self.name = name
+        self.type = type
+        self.size = len(data)
+
+
+class TimedEmbeddings(Embeddings):
+    """
+    Embeddings falsos que acumulan el tiempo empleado y simulan la latencia de la API.
+    """
+
+    def __init__(self, size: int, latency: float = 0.0):
+        self.underlying = DeterministicFakeEmbedding(size=size)
+        self.latency = latency
+        self.seconds = {"embed_documents": 0.0, "embed_query": 0.0}
+        self.requests = 0
+
+    def embed_documents(self, texts):
+        self.requests += 1
+        start = time.perf_counter()
+        time.sleep(self.latency)
+        vectors = self.underlying.embed_documents(texts)
+        self.seconds["embed_documents"] += time.perf_counter() - start
+        return vectors
+
+    def embed_query(self, text):
+        start = time.perf_counter()
+        time.sleep(self.latency)
+        vector = self.underlying.embed_query(text)
+        self.seconds["embed_query"] += time.perf_counter() - start
+        return vector
+
+
+class TimedBackend(VectorBackend):
+    """
+    Backend que delega en otro y acumula el tiempo de cada operación.
+    """
+
+    def __init__(self, backend: VectorBackend):
+        self.backend = backend
+        self.name = backend.name
+        self.seconds = {}
+
+    def _timed(self, operation: str, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return getattr(self.backend, operation)(*args, **kwargs)
+        finally:
+            self.seconds[operation] = self.seconds.get(operation, 0.0) + time.perf_counter() - start
+
+    def list_indexes(self):
+        return self._timed("list_indexes")
+
+    def create_index(self, *args, **kwargs):
+        return self._timed("create_index", *args, **kwargs)
+
+    def delete_index(self, *args, **kwargs):
+        return self._timed("delete_index", *args, **kwargs)
+
+    def upsert(self, *args, **kwargs):
+        return self._timed("upsert", *args, **kwargs)
+
+    def query(self, *args, **kwargs):
+        return self._timed("query", *args, **kwargs)
+
+    def fetch(self, *args, **kwargs):
+        return self._timed("fetch", *args, **kwargs)
+
+    def list_ids(self, *args, **kwargs):
+        return self._timed("list_ids", *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._timed("delete", *args, **kwargs)
+
+    def describe_index_stats(self, *args, **kwargs):
+        return self._timed("describe_index_stats", *args, **kwargs)
+
+    def invalidate(self, *args, **kwargs):
+        return self._timed("invalidate", *args, **kwargs)
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(rng.choice(VOCABULARY) for _ in range(count))
+
+
+def make_pdf(rng: random.Random, pages: int) -> bytes:
+    import fitz
+
+    pdf = fitz.open()
+    for page_number in range(pages):
+        page = pdf.new_page()
+        text = f"Tema {page_number}. " + _words(rng, 350)
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=9)
+    data = pdf.tobytes()
+    pdf.close()
+    return data
+
+
+def make_txt(rng: random.Random, paragraphs: int) -> bytes:
+    return "\n\n".join(_words(rng, 120) for _ in range(paragraphs)).encode("utf-8")
+
+
+def make_md(rng: random.Random, sections: int) -> bytes:
+    return "\n\n".join(f"## Sección {i}\n\n{_words(rng, 120)}" for i in range(sections)).encode("utf-8")
+
+
+def build_corpus(args) -> list:
+    rng = random.Random(args.seed)
+    files = []
+    for i in range(args.pdf_files):
+        files.append(SyntheticFile(f"doc{i}.pdf", make_pdf(rng, args.pages), "application/pdf"))
+    for i in range(args.txt_files):
+        files.append(SyntheticFile(f"notas{i}.txt", make_txt(rng, args.pages), "text/plain"))
+    for i in range(args.md_files):
+        files.append(SyntheticFile(f"apuntes{i}.md", make_md(rng, args.pages), "text/markdown"))
+    return files
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / scale
+
+
+def percentiles(samples: list) -> dict:
+    if not samples:
+        return {"p50": None, "p95": None}
+    return {"p50": float(np.percentile(samples, 50)), "p95": float(np.percentile(samples, 95))}
+
+
+def run_ingest(files: list, args, fake_embeddings, backend) -> dict:
+    # Parseo aislado: cuánto del tiempo de ingesta corresponde a cargar y dividir
+    # (los archivos se guardan antes en disco, como hace `ingest_docs` con las subidas en memoria)
+    with tempfile.TemporaryDirectory() as spool_dir:
+        paths = [utils._spool_upload(uploaded_file, spool_dir) for uploaded_file in files]
+        start = time.perf_counter()
+        chunks = 0
+        for uploaded_file, path in zip(files, paths):
+            for task in utils._plan_parse_tasks(uploaded_file.name, uploaded_file.name, path):
+                chunks += len(utils._parse_task(*task)[0])
+        parse_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ok = utils.ingest_docs(files, assistant_id="bench", index_name=INDEX_NAME, batch_size=args.batch_size,
+                           batch_tokens=args.batch_tokens, parse_workers=args.parse_workers)
+    seconds = time.perf_counter() - start
+    if not ok:
+        raise RuntimeError("La ingesta falló (ver el log)")
+
+    ingested = sum(entry["chunk_count"] for entry in utils.get_index_files(INDEX_NAME).values())
+    return {
+        "files": len(files),
+        "bytes": sum(uploaded_file.size for uploaded_file in files),
+        "chunks": ingested,
+        "seconds": seconds,
+        "chunks_per_sec": ingested / seconds if seconds else None,
+        "embed_requests": fake_embeddings.requests,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": {
+            "parse_split": parse_seconds,
+            "embed": fake_embeddings.seconds["embed_documents"],
+            "upsert": backend.seconds.get("upsert", 0.0),
+        },
+    }
+
+
+def run_queries(args, fake_embeddings, backend) -> dict:
+    rng = random.Random(args.seed + 1)
+    questions = [f"¿Qué relación hay entre {_words(rng, 2)} y {_words(rng, 2)}?" for _ in range(args.queries)]
+
+    embed_before = fake_embeddings.seconds["embed_query"]
+    backend_before = {key: backend.seconds.get(key, 0.0) for key in ("query", "fetch")}
+
+    timings = {"retrieval": [], "ttft": [], "total": []}
+    context_tokens = []
+    for question in questions:
+        for event in utils.stream_llm_on_index(question, [], INDEX_NAME):
+            if event["type"] == "done":
+                for stage, value in event["timings"].items():
+                    if value is not None:
+                        timings[stage].append(value)
+                context_tokens.append(event.get("context_tokens", 0))
+
+    return {
+        "queries": len(questions),
+        "latency": {stage: percentiles(samples) for stage, samples in timings.items()},
+        "context_tokens_mean": float(np.mean(context_tokens)) if context_tokens else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages_mean": {
+            "embed_query": (fake_embeddings.seconds["embed_query"] - embed_before) / len(questions),
+            "vector_query": (backend.seconds.get("query", 0.0) - backend_before["query"]) / len(questions),
+            "vector_fetch": (backend.seconds.get("fetch", 0.0) - backend_before["fetch"]) / len(questions),
+        },
+    }
+
+
+def _flatten(data: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in data.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(results: dict, baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    current, previous = _flatten(results["results"]), _flatten(baseline["results"])
+    print(f"\nComparación con {baseline_path}:")
+    for key in sorted(current):
+        if key in previous and previous[key]:
+            change = (current[key] - previous[key]) / previous[key] * 100
+            print(f"  {key:<40} {previous[key]:12.4f} -> {current[key]:12.4f} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sin conexión de ingesta y consultas")
+    parser.add_argument("--pdf-files", type=int, default=2)
+    parser.add_argument("--txt-files", type=int, default=2)
+    parser.add_argument("--md-files", type=int, default=0,
+                        help="Archivos Markdown (requiere el modelo de spaCy de unstructured)")
+    parser.add_argument("--pages", type=int, default=20, help="Páginas por PDF (y secciones por TXT/MD)")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--dimension", type=int, default=utils.EMBEDDING_DIMENSION)
+    parser.add_argument("--embedding-latency", type=float, default=0.0,
+                        help="Latencia simulada por llamada de embeddings, en segundos")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--batch-tokens", type=int, default=None)
+    parser.add_argument("--parse-workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Ruta del JSON de resultados")
+    parser.add_argument("--compare", default=None, help="JSON de una ejecución anterior con el que comparar")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output or os.path.join(
+        RESULTS_DIR, f"bench-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    ))
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # docs/ y los índices se crean en la carpeta temporal
+        os.chdir(workdir)
+
+        fake_embeddings = TimedEmbeddings(args.dimension, args.embedding_latency)
+        utils.embeddings = CachedEmbeddings(fake_embeddings, model_name="fake",
+                                            path=os.path.join(workdir, "embeddings.sqlite3"))
+        backend = TimedBackend(LocalBackend(os.path.join(workdir, "vectors")))
+        utils.set_vector_backend(backend)
+        utils._chat_models[(utils.CHAT_MODEL, 0)] = FakeListChatModel(
+            responses=["Respuesta sintética generada para el benchmark."]
+        )
+
+        files = build_corpus(args)
+        ingest = run_ingest(files, args, fake_embeddings, backend)
+        query = run_queries(args, fake_embeddings, backend)
+        os.chdir(ROOT)
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+        },
+        "config": vars(args),
+        "results": {"ingest": ingest, "query": query},
+    }
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+    print(json.dumps(results["results"], ensure_ascii=False, indent=2))
+    print(f"\nResultados guardados en {output}")
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
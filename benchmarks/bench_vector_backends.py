@@ -0,0 +1,106 @@
+"""
+Compara el backend local con Pinecone: tiempo de upsert y latencia de consulta
+(con y sin filtro de metadatos) sobre vectores aleatorios.
+
+Uso:
+    python benchmarks/bench_vector_backends.py --vectors 10000 --queries 200
+
+Pinecone solo se mide si PINECONE_API_KEY está definida; se crea un índice
+temporal que se elimina al terminar.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vector_backends import LocalBackend, PineconeBackend  # noqa: E402
+
+DIMENSION = 1536
+UPSERT_BATCH_SIZE = 100
+
+
+def _percentile(samples: list, q: float) -> float:
+    return float(np.percentile(samples, q)) * 1000
+
+
+def run(backend, index_name: str, vectors: np.ndarray, queries: np.ndarray, k: int, wait_for_ready=None) -> dict:
+    backend.create_index(index_name, dimension=vectors.shape[1])
+    try:
+        start = time.perf_counter()
+        for i in range(0, len(vectors), UPSERT_BATCH_SIZE):
+            batch = vectors[i:i + UPSERT_BATCH_SIZE]
+            backend.upsert(
+                index_name,
+                [f"v{j}" for j in range(i, i + len(batch))],
+                batch.tolist(),
+                [{"filename": f"file{j % 10}.pdf", "text": f"chunk {j}"} for j in range(i, i + len(batch))]
+            )
+        upsert_time = time.perf_counter() - start
+
+        if wait_for_ready:
+            wait_for_ready()
+
+        latencies = {"query": [], "query_filter": []}
+        for query in queries:
+            start = time.perf_counter()
+            backend.query(index_name, query.tolist(), k)
+            latencies["query"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            backend.query(index_name, query.tolist(), k, filter={"filename": {"$in": ["file1.pdf", "file2.pdf"]}})
+            latencies["query_filter"].append(time.perf_counter() - start)
+
+        return {
+            "upsert_s": upsert_time,
+            **{f"{name}_p50_ms": _percentile(samples, 50) for name, samples in latencies.items()},
+            **{f"{name}_p95_ms": _percentile(samples, 95) for name, samples in latencies.items()},
+        }
+    finally:
+        backend.delete_index(index_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends de vectores")
+    parser.add_argument("--vectors", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--dimension", type=int, default=DIMENSION)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.vectors, args.dimension), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dimension), dtype=np.float32)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        results["local"] = run(LocalBackend(root), "bench", vectors, queries, args.k)
+
+    if os.environ.get("PINECONE_API_KEY"):
+        backend = PineconeBackend()
+        index_name = f"bench-{uuid.uuid4().hex[:8]}"
+
+        def wait_for_ready():
+            # La escritura en Pinecone es eventualmente consistente
+            index = backend.index(index_name)
+            while index.describe_index_stats().total_vector_count < len(vectors):
+                time.sleep(1)
+
+        results["pinecone"] = run(backend, index_name, vectors, queries, args.k, wait_for_ready)
+    else:
+        print("PINECONE_API_KEY no definida: se omite Pinecone")
+
+    print(f"{args.vectors} vectores de dimensión {args.dimension}, {args.queries} consultas, k={args.k}")
+    for name, metrics in results.items():
+        print(f"\n[{name}]")
+        for metric, value in metrics.items():
+            print(f"  {metric:<20} {value:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tokenization import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Configuración por defecto
+DEFAULT_MAX_TURNS = 4
+DEFAULT_TOKEN_BUDGET = 2000
+
+_summary_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-summary")
+
+
+class ChatHistory:
+    """
+    Historial de chat con presupuesto de tokens.
+
+    Conserva literalmente los últimos `max_turns` turnos (pregunta + respuesta)
+    y va plegando los anteriores en un resumen que se calcula en segundo plano,
+    fuera del camino crítico de la siguiente pregunta. `to_messages()` nunca
+    supera `token_budget` tokens, por larga que sea la sesión.
+
+    Args:
+        summarize: Función (resumen_previo, [(rol, texto), ...]) -> resumen nuevo.
+        max_turns (int): Turnos que se conservan literalmente.
+        token_budget (int): Máximo de tokens del historial enviado a los prompts.
+    """
+
+    def __init__(self, summarize, max_turns: int = DEFAULT_MAX_TURNS, token_budget: int = DEFAULT_TOKEN_BUDGET):
+        self.summarize = summarize
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary = ""
+        self._messages = []
+        self._folding = []
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def add_turn(self, question: str, answer: str):
+        """
+        Añade un turno y, si se supera `max_turns`, pliega los más antiguos en el resumen.
+        """
+        with self._lock:
+            self._messages.extend([("human", question), ("ai", answer)])
+            if self._pending is None and len(self._messages) > 2 * self.max_turns:
+                overflow = len(self._messages) - 2 * self.max_turns
+                self._folding = self._messages[:overflow]
+                self._messages = self._messages[overflow:]
+                self._pending = _summary_pool.submit(self._fold, self.summary, list(self._folding))
+
+    def _fold(self, summary: str, messages: list):
+        try:
+            new_summary = self.summarize(summary, messages)
+        except Exception as e:
+            logger.warning(f"No se pudo resumir el historial: {e}")
+            new_summary = None
+        with self._lock:
+            if new_summary is not None:
+                self.summary = new_summary
+                self._folding = []
+            else:
+                # Si falla el resumen, los turnos vuelven al historial literal
+                self._messages = self._folding + self._messages
+                self._folding = []
+            self._pending = None
+
+    def to_messages(self) -> list:
+        """
+        Devuelve el historial para los prompts: el resumen (si lo hay) como mensaje
+        de sistema seguido de los turnos recientes, recortado al presupuesto de tokens.
+        """
+        with self._lock:
+            summary = self.summary
+            messages = self._folding + self._messages
+
+        result = []
+        used = 0
+        if summary:
+            summary_message = ("system", f"Resumen de la conversación anterior: {summary}")
+            used = count_tokens(summary_message[1])
+            result.append(summary_message)
+
+        # Turnos más recientes primero, hasta agotar el presupuesto
+        recent = []
+        for role, content in reversed(messages):
+            tokens = count_tokens(content)
+            if used + tokens > self.token_budget:
+                break
+            used += tokens
+            recent.append((role, content))
+        return result + list(reversed(recent))
+
+    def token_count(self) -> int:
+        return sum(count_tokens(content) for _, content in self.to_messages())
+
+    def clear(self):
+        with self._lock:
+            self.summary = ""
+            self._messages = []
+            self._folding = []
+
+    def __len__(self):
+        with self._lock:
+            return len(self._folding) + len(self._messages)
+
+    def __bool__(self):
+        return len(self) > 0 or bool(self.summary)
@@ -0,0 +1,276 @@
+"""
+Extractores de texto para DOCX y HTML.
+
+Ambos recorren el documento de forma perezosa (párrafo a párrafo en DOCX, por
+fragmentos del flujo en HTML), descartan el marcado y el contenido que no
+aporta (índices, menús, scripts, cabeceras y pies de página...) y agrupan el
+texto en secciones delimitadas por los títulos. Cada sección se devuelve como
+un `Document` con su posición (`section`) y su título (`heading`).
+"""
+import codecs
+import io
+import zipfile
+import xml.etree.ElementTree as ET
+from html.parser import HTMLParser
+
+from langchain_core.documents import Document
+
+# Tamaño máximo (en caracteres) de una sección: las más largas se parten en varias
+SECTION_MAX_CHARS = 20000
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+# Estilos de Word que no son contenido (tabla de contenidos, índices, notas al pie)
+_DOCX_SKIP_STYLES = ("toc ", "toc heading", "index ", "table of figures", "footnote text")
+
+# Etiquetas HTML cuyo contenido se descarta por completo
+_HTML_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "object",
+                   "head", "nav", "header", "footer", "aside", "form", "button", "select", "menu"}
+_HTML_SKIP_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "menu", "dialog"}
+# Etiquetas que empiezan una línea nueva
+_HTML_BLOCK_TAGS = {"p", "div", "br", "li", "ul", "ol", "dl", "dt", "dd", "tr", "table", "section",
+                    "article", "main", "blockquote", "pre", "figure", "figcaption", "hr", "caption"}
+_HTML_HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+# Elementos sin etiqueta de cierre: no pueden abrir un bloque descartado
+_HTML_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+                   "source", "track", "wbr"}
+
+
+class _Sections:
+    """
+    Acumula líneas de texto y las agrupa en secciones por título.
+    """
+
+    def __init__(self, source: str, metadata: dict = None):
+        self.source = source
+        self.metadata = metadata or {}
+        self.heading = ""
+        self.index = 0
+        self.lines = []
+        self.size = 0
+
+    def add(self, line: str):
+        line = line.strip()
+        if not line:
+            return []
+        self.lines.append(line)
+        self.size += len(line) + 1
+        # Sección demasiado larga: se cierra y continúa con el mismo título
+        return self.flush() if self.size >= SECTION_MAX_CHARS else []
+
+    def start(self, heading: str):
+        """
+        Cierra la sección en curso y abre otra con el título dado.
+        """
+        heading = heading.strip()
+        if not heading:
+            return []
+        sections = self.flush()
+        self.heading = heading
+        self.lines.append(heading)
+        self.size = len(heading) + 1
+        return sections
+
+    def flush(self) -> list:
+        # Una sección con solo su título no aporta nada por sí misma
+        if not self.lines or self.lines == [self.heading]:
+            return []
+        document = Document(
+            page_content="\n".join(self.lines),
+            metadata={"source": self.source, **self.metadata, "section": self.index, "heading": self.heading}
+        )
+        self.index += 1
+        self.lines = []
+        self.size = 0
+        return [document]
+
+
+def _docx_styles(archive: zipfile.ZipFile) -> dict:
+    """
+    Devuelve el nombre (en minúsculas) de cada estilo de párrafo por su ID.
+
+    Los IDs dependen del idioma de Word ("Ttulo1", "Heading1"...) pero los
+    nombres de los estilos integrados no ("heading 1").
+    """
+    if "word/styles.xml" not in archive.namelist():
+        return {}
+    styles = {}
+    root = ET.fromstring(archive.read("word/styles.xml"))
+    for style in root.iter(f"{_W}style"):
+        name = style.find(f"{_W}name")
+        if name is not None:
+            styles[style.get(f"{_W}styleId")] = name.get(f"{_W}val", "").lower()
+    return styles
+
+
+def _docx_is_heading(paragraph, style_name: str) -> bool:
+    if style_name == "title" or style_name.startswith("heading "):
+        return True
+    # Títulos con formato directo: nivel de esquema 0-8 (el 9 es texto independiente)
+    outline = paragraph.find(f"{_W}pPr/{_W}outlineLvl")
+    return outline is not None and outline.get(f"{_W}val", "9") < "9"
+
+
+def _docx_paragraph_text(paragraph) -> str:
+    parts = []
+    for node in paragraph.iter():
+        if node.tag == f"{_W}t":
+            parts.append(node.text or "")
+        elif node.tag == f"{_W}tab":
+            parts.append("\t")
+        elif node.tag in (f"{_W}br", f"{_W}cr"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+def iter_docx(data: bytes, source: str):
+    """
+    Extrae el texto de un DOCX sección a sección.
+
+    Solo se lee el cuerpo del documento (word/document.xml), sin cabeceras,
+    pies de página ni comentarios, y se omiten la tabla de contenidos y los
+    párrafos vacíos. Las celdas de las tablas se leen como párrafos.
+
+    Args:
+        data (bytes): Contenido del archivo.
+        source (str): Ruta con la que se registra el archivo en los metadatos.
+
+    Yields:
+        Document: Una sección con `section` (posición) y `heading` (título) en los metadatos.
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        styles = _docx_styles(archive)
+        sections = _Sections(source)
+        with archive.open("word/document.xml") as document_xml:
+            for _, element in ET.iterparse(document_xml, events=("end",)):
+                if element.tag != f"{_W}p":
+                    continue
+                style = element.find(f"{_W}pPr/{_W}pStyle")
+                style_name = styles.get(style.get(f"{_W}val"), "") if style is not None else ""
+                if not style_name.startswith(_DOCX_SKIP_STYLES):
+                    text = _docx_paragraph_text(element)
+                    if _docx_is_heading(element, style_name):
+                        yield from sections.start(" ".join(text.split()))
+                    else:
+                        yield from sections.add(text)
+                # Liberar el párrafo: los párrafos anidados (cuadros de texto) ya se han leído
+                element.clear()
+        yield from sections.flush()
+
+
+class _HTMLTextParser(HTMLParser):
+    """
+    Convierte HTML en líneas de texto y títulos, descartando el marcado y los
+    bloques de navegación, scripts y estilos.
+    """
+
+    def __init__(self, sections: _Sections):
+        super().__init__(convert_charrefs=True)
+        self.sections = sections
+        self.ready = []
+        self.skip_stack = []
+        self.pre_depth = 0
+        self.in_title = False
+        self.title = []
+        self.heading = None
+        self.text = []
+
+    def _skipped(self, tag: str, attrs: dict) -> bool:
+        return (tag in _HTML_SKIP_TAGS or attrs.get("role") in _HTML_SKIP_ROLES
+                or "hidden" in attrs or attrs.get("aria-hidden") == "true")
+
+    def _break(self):
+        text = "".join(self.text)
+        self.text = []
+        if self.pre_depth:
+            for line in text.split("\n"):
+                self.ready.extend(self.sections.add(line))
+        else:
+            self.ready.extend(self.sections.add(" ".join(text.split())))
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        # El <title> de la página está en el <head>, que se descarta; los de
+        # otros bloques descartados (p. ej. <svg>) no cuentan
+        if tag == "title" and (not self.skip_stack or self.skip_stack[-1][0] == "head"):
+            self.in_title = True
+            return
+        if self.skip_stack:
+            if tag == self.skip_stack[-1][0]:
+                self.skip_stack[-1][1] += 1
+            return
+        if tag not in _HTML_VOID_TAGS and self._skipped(tag, attrs):
+            self.skip_stack.append([tag, 1])
+        elif tag in _HTML_HEADINGS:
+            self._break()
+            self.heading = []
+        elif tag in _HTML_BLOCK_TAGS:
+            self._break()
+            if tag == "pre":
+                self.pre_depth += 1
+        elif tag in ("td", "th"):
+            self.text.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self.in_title:
+            # El <head> va antes que el cuerpo: todas las secciones llevan el título de la página
+            self.in_title = False
+            self.sections.metadata["title"] = " ".join("".join(self.title).split())
+            return
+        if self.skip_stack:
+            if tag == self.skip_stack[-1][0]:
+                self.skip_stack[-1][1] -= 1
+                if not self.skip_stack[-1][1]:
+                    self.skip_stack.pop()
+            return
+        if tag in _HTML_HEADINGS and self.heading is not None:
+            self.ready.extend(self.sections.start(" ".join("".join(self.heading).split())))
+            self.heading = None
+        elif tag in _HTML_BLOCK_TAGS:
+            self._break()
+            if tag == "pre" and self.pre_depth:
+                self.pre_depth -= 1
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title.append(data)
+        elif self.skip_stack:
+            return
+        elif self.heading is not None:
+            self.heading.append(data)
+        else:
+            self.text.append(data)
+
+    def close(self):
+        super().close()
+        self._break()
+
+
+def iter_html(data: bytes, source: str, block_size: int = 64 * 1024):
+    """
+    Extrae el texto visible de un HTML sección a sección.
+
+    El documento se analiza por bloques de `block_size` bytes y las secciones
+    (delimitadas por los títulos h1-h6) se devuelven en cuanto se completan.
+    Se descartan el <head>, los scripts y estilos, la navegación, cabeceras,
+    pies y barras laterales, formularios y los elementos ocultos.
+
+    Args:
+        data (bytes): Contenido del archivo.
+        source (str): Ruta con la que se registra el archivo en los metadatos.
+        block_size (int): Bytes que se pasan al parser en cada paso.
+
+    Yields:
+        Document: Una sección con `section`, `heading` y `title` (el <title> de la página) en los metadatos.
+    """
+    sections = _Sections(source, {"title": ""})
+    parser = _HTMLTextParser(sections)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for start in range(0, len(data), block_size):
+        parser.feed(decoder.decode(data[start:start + block_size]))
+        yield from parser.ready
+        parser.ready = []
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    yield from parser.ready
+    yield from sections.flush()
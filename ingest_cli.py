@@ -0,0 +1,221 @@
+"""
+Ingesta masiva de una carpeta completa en un asistente, sin pasar por Streamlit.
+
+Recorre la carpeta (por defecto docs/<asistente>/), omite los archivos que ya
+están en el índice con el mismo contenido (hash SHA-256 del manifiesto) e
+ingiere el resto con `utils.ingest_docs` (parseo y embeddings en paralelo).
+Los archivos se procesan en grupos y cada lote subido se anota en un
+checkpoint, de modo que si se interrumpe basta con volver a lanzar el mismo
+comando para continuar sin volver a embeber lo ya subido.
+
+Con `--dir` fuera de docs/<asistente>/, los archivos se copian allí antes de
+ingerirlos, igual que las subidas de la aplicación, para que la ruta `source`
+de sus chunks exista y la aplicación pueda mostrarlos y eliminarlos.
+
+Uso:
+    python ingest_cli.py mi-asistente
+    python ingest_cli.py mi-asistente --dir ~/apuntes/semestre-1 --report informe.json
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+import manifest
+import utils
+
+logger = logging.getLogger("ingest_cli")
+
+CHECKPOINT_DIR = os.path.join(".cache", "ingest_cli")
+# Archivos por llamada a `ingest_docs`: el manifiesto se actualiza al terminar cada grupo
+FILES_PER_GROUP = 50
+
+
+def scan_directory(directory: str) -> list:
+    """
+    Enumera los archivos de la carpeta (recursivamente), con su nombre relativo a ella.
+
+    Returns:
+        list: Tuplas (nombre, ruta) ordenadas por nombre.
+    """
+    files = []
+    for root, dirs, filenames in os.walk(directory):
+        # Ignorar carpetas y archivos ocultos (manifiesto, índice léxico, configuración...)
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        for filename in filenames:
+            if filename.startswith("."):
+                continue
+            path = os.path.join(root, filename)
+            files.append((os.path.relpath(path, directory).replace(os.sep, "/"), path))
+    return sorted(files)
+
+
+def checkpoint_path(index_name: str) -> str:
+    return os.path.join(CHECKPOINT_DIR, f"{index_name}.checkpoint.jsonl")
+
+
+def read_checkpoint(index_name: str) -> set:
+    """
+    Devuelve los IDs de los chunks subidos en una ejecución anterior interrumpida.
+    """
+    path = checkpoint_path(index_name)
+    if not os.path.exists(path):
+        return set()
+    ids = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                ids.update(json.loads(line))
+            except json.JSONDecodeError:
+                # Última línea a medio escribir tras una interrupción
+                continue
+    return ids
+
+
+def copy_into_docs(path: str, target: str):
+    """
+    Copia un archivo a la carpeta de documentos del asistente si no está ya allí.
+    """
+    if os.path.exists(target) and os.path.samefile(path, target):
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copy2(path, target)
+
+
+def run(args) -> dict:
+    docs_dir = os.path.join(manifest.DOCS_DIR, args.index)
+    directory = args.dir or docs_dir
+    if not os.path.isdir(directory):
+        raise SystemExit(f"La carpeta {directory} no existe")
+    external = os.path.abspath(directory) != os.path.abspath(docs_dir)
+
+    started = time.perf_counter()
+    report = {
+        "index": args.index,
+        "directory": os.path.abspath(directory),
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "files": [],
+    }
+
+    known_files = manifest.load_manifest(args.index)["files"]
+    pending = {"new": [], "changed": []}
+    for name, path in scan_directory(directory):
+        entry = {"file": name, "size": os.path.getsize(path)}
+        report["files"].append(entry)
+        if not name.endswith(utils.SUPPORTED_EXTENSIONS):
+            entry["status"] = "unsupported"
+            continue
+
+        content_hash = utils.file_sha256(path)
+        known = known_files.get(name)
+        if known and known.get("hash") == content_hash:
+            entry["status"] = "unchanged"
+            entry["chunks"] = known["chunk_count"]
+            if external:
+                copy_into_docs(path, os.path.join(docs_dir, name))
+        elif known and known.get("hash"):
+            pending["changed"].append((name, path, entry))
+        else:
+            # Nuevo, o sin hash porque su ingesta anterior no llegó a completarse
+            pending["new"].append((name, path, entry))
+
+    total_pending = len(pending["new"]) + len(pending["changed"])
+    logger.info(f"{len(report['files'])} archivos en {directory}: {total_pending} por ingerir")
+
+    skip_ids = set() if args.restart else read_checkpoint(args.index)
+    if skip_ids:
+        logger.info(f"Reanudando: {len(skip_ids)} chunks ya subidos en la ejecución anterior")
+
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
+    with open(checkpoint_path(args.index), "w" if args.restart else "a", encoding="utf-8") as checkpoint:
+        def on_progress(event):
+            if event["event"] == "batch":
+                checkpoint.write(json.dumps([doc_id for ids in event["ids_by_file"].values() for doc_id in ids]) + "\n")
+                checkpoint.flush()
+
+        done = 0
+        # Archivos nuevos y archivos modificados (estos reemplazan su versión anterior)
+        for delete_existing_files, group_files in ((False, pending["new"]), (True, pending["changed"])):
+            for i in range(0, len(group_files), args.files_per_group):
+                group = group_files[i:i + args.files_per_group]
+                if external:
+                    # Ingerir la copia de docs/<asistente>/, que es la ruta que se registra
+                    for name, path, _ in group:
+                        copy_into_docs(path, os.path.join(docs_dir, name))
+                    group = [(name, os.path.join(docs_dir, name), entry) for name, path, entry in group]
+                result = utils.ingest_docs(
+                    [utils.StoredFile(path, name=name) for name, path, _ in group],
+                    assistant_id=args.assistant_id,
+                    index_name=args.index,
+                    delete_existing_files=delete_existing_files,
+                    batch_size=args.batch_size,
+                    batch_tokens=args.batch_tokens,
+                    max_workers=args.max_workers,
+                    parse_workers=args.parse_workers,
+                    skip_ids=skip_ids,
+                    progress=on_progress
+                )
+
+                recorded = manifest.load_manifest(args.index)["files"]
+                for name, _, entry in group:
+                    if result is False:
+                        entry["status"] = "failed"
+                    elif name in recorded:
+                        entry["status"] = "replaced" if delete_existing_files else "ingested"
+                        entry["chunks"] = recorded[name]["chunk_count"]
+                    else:
+                        # Sin texto extraíble
+                        entry["status"] = "empty"
+                done += len(group)
+                logger.info(f"Progreso: {done}/{total_pending} archivos")
+
+    failed = [entry for entry in report["files"] if entry["status"] == "failed"]
+    if not failed:
+        # Todo subido: el checkpoint ya no hace falta
+        os.remove(checkpoint_path(args.index))
+
+    report["finished_at"] = datetime.now().isoformat(timespec="seconds")
+    report["seconds"] = time.perf_counter() - started
+    report["totals"] = {}
+    for entry in report["files"]:
+        report["totals"][entry["status"]] = report["totals"].get(entry["status"], 0) + 1
+    report["totals"]["chunks"] = sum(entry.get("chunks", 0) for entry in report["files"]
+                                     if entry["status"] in ("ingested", "replaced"))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta masiva de una carpeta en un asistente")
+    parser.add_argument("index", help="Nombre del asistente (índice)")
+    parser.add_argument("--dir", default=None, help="Carpeta a ingerir (por defecto docs/<asistente>/); si es otra, sus archivos se copian allí")
+    parser.add_argument("--assistant-id", default="5")
+    parser.add_argument("--report", default=None, help="Ruta del informe JSON (por defecto, salida estándar)")
+    parser.add_argument("--files-per-group", type=int, default=FILES_PER_GROUP)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--batch-tokens", type=int, default=None)
+    parser.add_argument("--max-workers", type=int, default=None)
+    parser.add_argument("--parse-workers", type=int, default=None)
+    parser.add_argument("--restart", action="store_true",
+                        help="Ignorar el checkpoint de una ejecución anterior interrumpida")
+    args = parser.parse_args()
+
+    report = run(args)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(output)
+        logger.info(f"Informe guardado en {args.report}")
+    else:
+        print(output)
+
+    totals = ", ".join(f"{status}: {count}" for status, count in report["totals"].items())
+    logger.info(f"Ingesta terminada en {report['seconds']:.1f}s ({totals})")
+    sys.exit(1 if report["totals"].get("failed") else 0)
+
+
+if __name__ == "__main__":
+    main()
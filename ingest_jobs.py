@@ -0,0 +1,286 @@
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import utils
+from storage import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+INGEST_JOBS_DIR = os.getenv("INGEST_JOBS_DIR", os.path.join(".cache", "ingest_jobs"))
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "1"))
+
+# Estados de un trabajo
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+RESUMABLE_STATES = (FAILED, CANCELLED, INTERRUPTED)
+
+_jobs = {}
+_cancel_events = {}
+_lock = threading.RLock()
+_pool = ThreadPoolExecutor(max_workers=INGEST_JOB_WORKERS, thread_name_prefix="ingest-job")
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat(timespec="seconds")
+
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(INGEST_JOBS_DIR, f"{job_id}.json")
+
+
+def _checkpoint_path(job_id: str) -> str:
+    return os.path.join(INGEST_JOBS_DIR, f"{job_id}.checkpoint.jsonl")
+
+
+def _save(job: dict):
+    """
+    Guarda el estado del trabajo de forma atómica (ver `storage.atomic_write_json`).
+    """
+    job["updated_at"] = _now()
+    atomic_write_json(_job_path(job["id"]), job)
+
+
+def _load_jobs():
+    """
+    Carga los trabajos guardados. Los que figuraban en curso pertenecían a un
+    proceso anterior y se marcan como interrumpidos (se pueden reanudar).
+    """
+    if not os.path.exists(INGEST_JOBS_DIR):
+        return
+    for filename in os.listdir(INGEST_JOBS_DIR):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(INGEST_JOBS_DIR, filename), "r", encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"No se pudo cargar el trabajo de ingesta {filename}: {e}")
+            continue
+        if job["status"] in ACTIVE_STATES:
+            job["status"] = INTERRUPTED
+            _save(job)
+        _jobs[job["id"]] = job
+
+
+def _read_checkpoint(job_id: str) -> set:
+    """
+    Devuelve los IDs de los chunks ya subidos en intentos anteriores del trabajo.
+    """
+    path = _checkpoint_path(job_id)
+    if not os.path.exists(path):
+        return set()
+    ids = set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Última línea a medio escribir tras una interrupción
+                continue
+            for file_ids in entry["ids_by_file"].values():
+                ids.update(file_ids)
+    return ids
+
+
+def _run(job_id: str):
+    with _lock:
+        job = _jobs[job_id]
+        cancel_event = _cancel_events[job_id]
+        # Cancelado mientras estaba en cola (o ya lanzado por otra reanudación)
+        if job["status"] != QUEUED:
+            return
+        job["status"] = RUNNING
+        job["attempts"] += 1
+        job["error"] = None
+        _save(job)
+
+    skip_ids = _read_checkpoint(job_id)
+    checkpoint = open(_checkpoint_path(job_id), "a", encoding="utf-8")
+
+    def on_progress(event):
+        with _lock:
+            if event["event"] == "parsed":
+                file_progress = job["progress"][event["filename"]]
+                file_progress["status"] = "procesando"
+                file_progress["chunks_parsed"] += event["chunks"]
+            elif event["event"] == "batch":
+                # Checkpoint: IDs del último lote subido, antes de actualizar el estado
+                checkpoint.write(json.dumps({"batch": event["batch"], "ids_by_file": event["ids_by_file"]}) + "\n")
+                checkpoint.flush()
+                for filename, ids in event["ids_by_file"].items():
+                    job["progress"][filename]["chunks_upserted"] += len(ids)
+                job["batches_done"] += 1
+                job["last_batch"] = {"number": event["batch"], "at": _now(),
+                                     "chunks": sum(len(ids) for ids in event["ids_by_file"].values())}
+            _save(job)
+
+    with _lock:
+        for file_progress in job["progress"].values():
+            file_progress.update({"status": "pendiente", "chunks_parsed": 0})
+
+    try:
+        result = utils.ingest_docs(
+            [utils.StoredFile(entry["path"], entry["name"], entry["type"]) for entry in job["files"]],
+            assistant_id=job["assistant_id"],
+            index_name=job["index_name"],
+            delete_existing_files=job["delete_existing_files"],
+            skip_ids=skip_ids,
+            progress=on_progress,
+            cancel_event=cancel_event
+        )
+    except Exception as e:
+        result = False
+        job["error"] = str(e)
+    finally:
+        checkpoint.close()
+
+    with _lock:
+        if cancel_event.is_set():
+            job["status"] = CANCELLED
+        elif result is False:
+            job["status"] = FAILED
+            job["error"] = job["error"] or "Error durante la ingesta (ver el log)"
+        else:
+            job["status"] = COMPLETED
+            if result is None:
+                job["error"] = "No se pudieron cargar documentos válidos"
+        for file_progress in job["progress"].values():
+            file_progress["status"] = "completado" if job["status"] == COMPLETED else job["status"]
+        _save(job)
+    logger.info(f"Trabajo de ingesta {job_id} ({job['index_name']}): {job['status']}")
+
+
+def submit_job(index_name: str, paths: list, assistant_id: str, delete_existing_files: bool = False,
+               file_types: dict = None) -> str:
+    """
+    Encola la ingesta en segundo plano de archivos ya guardados en disco.
+
+    Args:
+        index_name (str): Nombre del índice.
+        paths (list): Rutas de los archivos a ingerir.
+        assistant_id (str): Identificador del asistente que se guarda en los metadatos.
+        delete_existing_files (bool): Reemplazar la versión previa de cada archivo (ver `utils.ingest_docs`).
+        file_types (dict): Tipo MIME por nombre de archivo (si no, se deduce de la extensión).
+
+    Returns:
+        str: ID del trabajo.
+    """
+    job_id = uuid.uuid4().hex[:12]
+    files = []
+    for path in paths:
+        stored = utils.StoredFile(path, type=(file_types or {}).get(os.path.basename(path)))
+        files.append({"name": stored.name, "path": os.path.abspath(path), "type": stored.type, "size": stored.size})
+
+    job = {
+        "id": job_id,
+        "index_name": index_name,
+        "assistant_id": assistant_id,
+        "delete_existing_files": delete_existing_files,
+        "files": files,
+        "status": QUEUED,
+        "attempts": 0,
+        "error": None,
+        "batches_done": 0,
+        "last_batch": None,
+        "progress": {
+            entry["name"]: {"status": "pendiente", "chunks_parsed": 0, "chunks_upserted": 0, "size": entry["size"]}
+            for entry in files
+        },
+        "created_at": _now(),
+    }
+    with _lock:
+        _jobs[job_id] = job
+        _cancel_events[job_id] = threading.Event()
+        _save(job)
+    _pool.submit(_run, job_id)
+    logger.info(f"Trabajo de ingesta {job_id} encolado para {index_name} ({len(files)} archivos)")
+    return job_id
+
+
+def resume_job(job_id: str) -> bool:
+    """
+    Reanuda un trabajo fallido, cancelado o interrumpido: los chunks que ya se
+    subieron (según su checkpoint) no se vuelven a embeber.
+
+    Returns:
+        bool: True si se ha vuelto a encolar.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job["status"] not in RESUMABLE_STATES:
+            return False
+        job["status"] = QUEUED
+        _cancel_events[job_id] = threading.Event()
+        _save(job)
+    _pool.submit(_run, job_id)
+    logger.info(f"Trabajo de ingesta {job_id} reanudado")
+    return True
+
+
+def cancel_job(job_id: str) -> bool:
+    """
+    Cancela un trabajo en cola (de inmediato) o en curso (se detiene tras los
+    lotes en vuelo).
+
+    Returns:
+        bool: True si el trabajo estaba activo.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job["status"] not in ACTIVE_STATES:
+            return False
+        _cancel_events[job_id].set()
+        if job["status"] == QUEUED:
+            job["status"] = CANCELLED
+            for file_progress in job["progress"].values():
+                file_progress["status"] = CANCELLED
+            _save(job)
+            logger.info(f"Trabajo de ingesta {job_id} ({job['index_name']}): {CANCELLED}")
+        return True
+
+
+def get_job(job_id: str) -> dict:
+    with _lock:
+        job = _jobs.get(job_id)
+        return json.loads(json.dumps(job)) if job else None
+
+
+def list_jobs(index_name: str = None) -> list:
+    """
+    Devuelve los trabajos (opcionalmente de un índice), del más reciente al más antiguo.
+    """
+    with _lock:
+        jobs = [json.loads(json.dumps(job)) for job in _jobs.values()
+                if index_name is None or job["index_name"] == index_name]
+    return sorted(jobs, key=lambda job: job["created_at"], reverse=True)
+
+
+def delete_job(job_id: str) -> bool:
+    """
+    Olvida un trabajo terminado y borra su estado y checkpoint.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job["status"] in ACTIVE_STATES:
+            return False
+        del _jobs[job_id]
+        _cancel_events.pop(job_id, None)
+        for path in (_job_path(job_id), _checkpoint_path(job_id)):
+            if os.path.exists(path):
+                os.remove(path)
+        return True
+
+
+_load_jobs()
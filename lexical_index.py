@@ -0,0 +1,221 @@
+import json
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from manifest import DOCS_DIR
+from storage import atomic_write_json, file_lock
+
+# Índice invertido de cada asistente, guardado junto a sus documentos
+LEXICAL_FILENAME = ".lexical.json"
+
+# Parámetros de BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list:
+    """
+    Divide un texto en términos: minúsculas y sin tildes, conservando números
+    ("art. 14" -> ["art", "14"]).
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _TOKEN.findall(text)
+
+
+def lexical_path(index_name: str) -> str:
+    return os.path.join(DOCS_DIR, index_name, LEXICAL_FILENAME)
+
+
+def _file_stamp(path: str):
+    # Identidad, tamaño y fecha del archivo: cambian cada vez que alguien lo guarda
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class LexicalIndex:
+    """
+    Índice invertido BM25 de los chunks de un asistente.
+
+    Se actualiza de forma incremental (`add` / `remove` / `remove_file`) y se
+    persiste con `save`. En disco solo se guarda el índice directo
+    (chunk -> frecuencias de términos); las listas invertidas se reconstruyen al cargar.
+
+    Otros procesos (p. ej. `ingest_cli`) pueden modificar el mismo archivo:
+    `refresh` lo recarga si ha cambiado y `save`, bajo un bloqueo de archivo,
+    recarga la versión de disco y vuelve a aplicar sobre ella los cambios
+    pendientes antes de escribir, de modo que no se pisan los de otro proceso.
+    """
+
+    def __init__(self, index_name: str):
+        self.index_name = index_name
+        self._docs = {}
+        self._postings = {}
+        self._total_length = 0
+        # Cambios desde la última carga o guardado, para reaplicarlos tras recargar
+        self._pending = []
+        self._stamp = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, index_name: str):
+        """
+        Carga el índice de disco.
+
+        Returns:
+            LexicalIndex: El índice, o None si todavía no existe.
+        """
+        if not os.path.exists(lexical_path(index_name)):
+            return None
+        lexical = cls(index_name)
+        lexical._reload()
+        return lexical
+
+    def _lock_path(self) -> str:
+        return lexical_path(self.index_name) + ".lock"
+
+    def _reload(self):
+        """
+        Sustituye el contenido por el del archivo y reaplica los cambios pendientes.
+        """
+        path = lexical_path(self.index_name)
+        stamp = _file_stamp(path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._docs = {}
+        self._postings = {}
+        self._total_length = 0
+        for doc_id, entry in data["docs"].items():
+            self._index(doc_id, entry["filename"], entry["terms"])
+        for change in self._pending:
+            self._apply(change)
+        self._stamp = stamp
+
+    def refresh(self):
+        """
+        Recarga el índice si otro proceso ha guardado una versión más reciente.
+        """
+        with self._lock:
+            stamp = _file_stamp(lexical_path(self.index_name))
+            if stamp is not None and stamp != self._stamp:
+                with file_lock(self._lock_path(), shared=True):
+                    self._reload()
+
+    def save(self):
+        """
+        Guarda el índice de forma atómica (ver `storage.atomic_write_json`),
+        integrando antes los cambios que otro proceso haya guardado.
+        """
+        path = lexical_path(self.index_name)
+        with self._lock, file_lock(self._lock_path()):
+            stamp = _file_stamp(path)
+            if stamp is not None and stamp != self._stamp:
+                self._reload()
+            atomic_write_json(path, {"docs": self._docs}, indent=None)
+            self._stamp = _file_stamp(path)
+            self._pending = []
+
+    def _index(self, doc_id: str, filename: str, terms: dict):
+        self._docs[doc_id] = {"filename": filename, "terms": terms, "length": sum(terms.values())}
+        self._total_length += self._docs[doc_id]["length"]
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+
+    def _unindex(self, doc_id: str):
+        entry = self._docs.pop(doc_id, None)
+        if entry is None:
+            return
+        self._total_length -= entry["length"]
+        for term in entry["terms"]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _apply(self, change: tuple):
+        operation, argument = change
+        if operation == "add":
+            for doc_id, filename, terms in argument:
+                self._unindex(doc_id)
+                self._index(doc_id, filename, terms)
+        elif operation == "remove":
+            for doc_id in argument:
+                self._unindex(doc_id)
+        elif operation == "remove_file":
+            for doc_id in [doc_id for doc_id, entry in self._docs.items() if entry["filename"] == argument]:
+                self._unindex(doc_id)
+
+    def _change(self, change: tuple):
+        with self._lock:
+            self._pending.append(change)
+            self._apply(change)
+
+    def add(self, ids: list, texts: list, filenames: list):
+        """
+        Indexa (o reindexa) los chunks `ids` con sus textos y archivos de origen.
+        """
+        self._change(("add", [(doc_id, filename, dict(Counter(tokenize(text))))
+                              for doc_id, text, filename in zip(ids, texts, filenames)]))
+
+    def remove(self, ids: list):
+        self._change(("remove", list(ids)))
+
+    def remove_file(self, filename: str):
+        """
+        Elimina todos los chunks de un archivo.
+        """
+        self._change(("remove_file", filename))
+
+    def search(self, query: str, k: int) -> list:
+        """
+        Busca los `k` chunks con mayor puntuación BM25 para la consulta.
+
+        Returns:
+            list: Tuplas (id, puntuación) ordenadas de mayor a menor puntuación.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            total_docs = len(self._docs)
+            if not total_docs:
+                return []
+            average_length = self._total_length / total_docs
+
+            scores = Counter()
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    length = self._docs[doc_id]["length"]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[doc_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            return scores.most_common(k)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._docs)
+
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    Fusiona varias listas ordenadas de IDs con Reciprocal Rank Fusion.
+
+    Returns:
+        list: Tuplas (id, puntuación) ordenadas por la suma de 1 / (k + posición) en cada lista.
+    """
+    scores = Counter()
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            scores[doc_id] += 1 / (k + rank)
+    return scores.most_common()
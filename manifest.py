@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+from storage import atomic_write_json
+
+# Configuración
+DOCS_DIR = "docs"
+MANIFEST_FILENAME = ".manifest.json"
+# Carpeta con los IDs de los chunks de cada archivo (uno por archivo)
+CHUNKS_DIRNAME = ".chunks"
+
+_lock = threading.RLock()
+
+
+def manifest_path(index_name: str) -> str:
+    return os.path.join(DOCS_DIR, index_name, MANIFEST_FILENAME)
+
+
+def chunk_ids_path(index_name: str, filename: str) -> str:
+    # El nombre puede incluir subcarpetas ("sub/b.txt"): se usa su hash
+    digest = hashlib.sha256(filename.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(DOCS_DIR, index_name, CHUNKS_DIRNAME, f"{digest}.json")
+
+
+def manifest_exists(index_name: str) -> bool:
+    return os.path.exists(manifest_path(index_name))
+
+
+def load_manifest(index_name: str) -> dict:
+    """
+    Carga el manifiesto de documentos de un índice: un resumen por archivo,
+    sin los IDs de sus chunks (ver `load_chunk_ids`).
+
+    Returns:
+        dict: Diccionario {"files": {filename: entrada}}. Vacío si no existe.
+    """
+    path = manifest_path(index_name)
+    with _lock:
+        if not os.path.exists(path):
+            return {"files": {}}
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if any("chunk_ids" in entry for entry in manifest["files"].values()):
+            manifest = _migrate(index_name, manifest)
+        return manifest
+
+
+def _migrate(index_name: str, manifest: dict) -> dict:
+    """
+    Pasa los IDs de chunks de un manifiesto antiguo (guardados en línea) a sus archivos.
+    """
+    for filename, entry in manifest["files"].items():
+        if "chunk_ids" in entry:
+            atomic_write_json(chunk_ids_path(index_name, filename), entry.pop("chunk_ids"), indent=None)
+    save_manifest(index_name, manifest)
+    return manifest
+
+
+def save_manifest(index_name: str, manifest: dict):
+    """
+    Guarda el manifiesto de forma atómica (ver `storage.atomic_write_json`).
+    """
+    with _lock:
+        atomic_write_json(manifest_path(index_name), manifest)
+
+
+def load_chunk_ids(index_name: str, filename: str) -> list:
+    """
+    Devuelve los IDs de los chunks de un archivo ([] si no consta en el manifiesto).
+    """
+    path = chunk_ids_path(index_name, filename)
+    with _lock:
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def record_files(index_name: str, entries: dict):
+    """
+    Registra (o actualiza) varios archivos y sus chunks en el manifiesto del
+    índice, con una sola lectura y escritura del manifiesto.
+
+    Args:
+        index_name (str): Nombre del índice.
+        entries (dict): {filename: {"chunk_ids", "size", "hash", "filetype"}} con los IDs de los
+            vectores del archivo, su tamaño en bytes, su hash SHA-256 y su tipo MIME.
+    """
+    if not entries:
+        return
+    ingested_at = datetime.utcnow().isoformat(timespec="seconds")
+    with _lock:
+        manifest = load_manifest(index_name)
+        for filename, entry in entries.items():
+            atomic_write_json(chunk_ids_path(index_name, filename), list(entry["chunk_ids"]), indent=None)
+            manifest["files"][filename] = {
+                "chunk_count": len(entry["chunk_ids"]),
+                "size": entry.get("size"),
+                "hash": entry.get("hash"),
+                "filetype": entry.get("filetype"),
+                "ingested_at": ingested_at
+            }
+        save_manifest(index_name, manifest)
+
+
+def record_file(index_name: str, filename: str, chunk_ids: list, size=None, content_hash=None, filetype=None):
+    """
+    Registra (o actualiza) un archivo y sus chunks en el manifiesto del índice
+    (ver `record_files`).
+    """
+    record_files(index_name, {filename: {"chunk_ids": chunk_ids, "size": size, "hash": content_hash,
+                                         "filetype": filetype}})
+
+
+def remove_file(index_name: str, filename: str):
+    """
+    Elimina un archivo del manifiesto.
+
+    Returns:
+        dict: La entrada eliminada, o None si no estaba registrada.
+    """
+    with _lock:
+        manifest = load_manifest(index_name)
+        entry = manifest["files"].pop(filename, None)
+        if entry is not None:
+            save_manifest(index_name, manifest)
+        path = chunk_ids_path(index_name, filename)
+        if os.path.exists(path):
+            os.remove(path)
+        return entry
+
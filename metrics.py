@@ -0,0 +1,159 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_PREFIX = "study_assistant"
+
+# Límites (en segundos) de los buckets del histograma de duración
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Atributos numéricos de un span que se acumulan como contadores (con su descripción)
+COUNTED_ATTRIBUTES = {"tokens": "tokens", "chunks": "fragmentos", "pages": "páginas"}
+
+_lock = threading.Lock()
+_durations = {}
+_counters = {}
+_current_trace = contextvars.ContextVar("trace", default=None)
+_server = None
+
+
+def _record(name: str, seconds: float, attributes: dict):
+    with _lock:
+        histogram = _durations.setdefault(name, {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0})
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["sum"] += seconds
+        histogram["count"] += 1
+        for attribute in COUNTED_ATTRIBUTES:
+            if isinstance(attributes.get(attribute), (int, float)):
+                key = (attribute, name)
+                _counters[key] = _counters.get(key, 0) + attributes[attribute]
+
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.append({"name": name, "seconds": seconds, **attributes})
+
+
+class Span:
+    """
+    Etapa medida. Los atributos (`tokens`, `chunks`, ...) se pueden añadir
+    mientras dura con `set`.
+    """
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.seconds = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Mide la duración de una etapa y la registra en las métricas del proceso y,
+    si hay una traza activa (ver `trace`), también en ella.
+
+        with metrics.span("embed", chunks=len(batch)) as s:
+            ...
+            s.set(tokens=n)
+    """
+    current = Span(name, **attributes)
+    start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.seconds = time.perf_counter() - start
+        _record(name, current.seconds, current.attributes)
+
+
+def record(name: str, seconds: float, **attributes):
+    """
+    Registra una etapa medida fuera de `span` (p. ej. en otro proceso).
+    """
+    _record(name, seconds, attributes)
+
+
+@contextmanager
+def trace():
+    """
+    Recoge en una lista los spans de la operación en curso (p. ej. una consulta).
+
+    Las tareas de asyncio (y los hilos de `asyncio.to_thread`) lanzadas durante la
+    operación comparten la traza.
+    """
+    spans = []
+    token = _current_trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_trace.reset(token)
+
+
+def render_prometheus() -> str:
+    """
+    Devuelve las métricas en el formato de texto de Prometheus.
+    """
+    lines = [
+        f"# HELP {METRICS_PREFIX}_stage_seconds Duración de cada etapa de ingesta y consulta.",
+        f"# TYPE {METRICS_PREFIX}_stage_seconds histogram",
+    ]
+    with _lock:
+        for name, histogram in sorted(_durations.items()):
+            for bound, count in zip(BUCKETS, histogram["buckets"]):
+                lines.append(f'{METRICS_PREFIX}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'{METRICS_PREFIX}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'{METRICS_PREFIX}_stage_seconds_sum{{stage="{name}"}} {histogram["sum"]}')
+            lines.append(f'{METRICS_PREFIX}_stage_seconds_count{{stage="{name}"}} {histogram["count"]}')
+
+        for attribute, description in COUNTED_ATTRIBUTES.items():
+            metric = f"{METRICS_PREFIX}_{attribute}_total"
+            values = sorted((name, value) for (counted, name), value in _counters.items() if counted == attribute)
+            if values:
+                lines.append(f"# HELP {metric} Total de {description} procesados por etapa.")
+                lines.append(f"# TYPE {metric} counter")
+                lines.extend(f'{metric}{{stage="{name}"}} {value}' for name, value in values)
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _durations.clear()
+        _counters.clear()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = METRICS_PORT):
+    """
+    Expone las métricas en http://0.0.0.0:<port>/metrics en un hilo en segundo
+    plano (una sola vez por proceso). No hace nada si `port` es 0.
+    """
+    global _server
+    with _lock:
+        if _server is not None or not port:
+            return
+        _server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Métricas disponibles en http://0.0.0.0:{port}/metrics")
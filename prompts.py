@@ -0,0 +1,29 @@
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
+
+# Copias locales de los prompts de LangChain Hub usados por la cadena RAG,
+# para no descargarlos en cada consulta ni depender de la red.
+
+# langchain-ai/retrieval-qa-chat
+RETRIEVAL_QA_CHAT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "Answer any use questions based solely on the context below:\n\n<context>\n{context}\n</context>"),
+    MessagesPlaceholder(variable_name="chat_history", optional=True),
+    ("human", "{input}")
+])
+
+# langchain-ai/chat-langchain-rephrase
+REPHRASE_PROMPT = PromptTemplate.from_template(
+    "Given the following conversation and a follow up question, rephrase the follow up "
+    "question to be a standalone question.\n\n"
+    "Chat History:\n{chat_history}\n"
+    "Follow Up Input: {input}\n"
+    "Standalone Question:"
+)
+
+# Resumen progresivo del historial (basado en el SUMMARY_PROMPT de ConversationSummaryMemory)
+SUMMARY_PROMPT = PromptTemplate.from_template(
+    "Progressively summarize the lines of conversation provided, adding onto the previous summary "
+    "returning a new summary. Keep the language of the conversation.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New lines of conversation:\n{new_lines}\n\n"
+    "New summary:"
+)
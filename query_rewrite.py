@@ -0,0 +1,117 @@
+import re
+import threading
+
+# Decisiones posibles sobre la reformulación de una pregunta
+NO_HISTORY = "no_history"
+DIRECT = "direct"
+REPHRASE = "rephrase"
+UNSURE = "unsure"
+
+# Palabras que remiten a algo dicho antes en la conversación
+ANAPHORA = {
+    # español
+    "él", "ella", "ellos", "ellas", "ello", "eso", "esto", "aquello", "ese", "esa", "esos", "esas",
+    "este", "esta", "estos", "estas", "aquel", "aquella", "dicho", "dicha", "dichos", "dichas",
+    "anterior", "anteriores", "anteriormente", "mismo", "misma", "mismos", "mismas", "arriba",
+    "previo", "previa", "otro", "otra", "otros", "otras", "suyo", "suya",
+    # inglés
+    "it", "its", "this", "that", "these", "those", "they", "them", "their", "he", "she", "him", "her",
+    "above", "previous", "same", "former", "latter", "else",
+}
+# Conectores que, al principio de la pregunta, indican continuación
+CONTINUATIONS = {"y", "pero", "entonces", "también", "además", "and", "but", "so", "also"}
+# Imperativos con pronombre enclítico: "explícamelo", "dímelo", "compáralos", "resúmela"...
+ENCLITIC = re.compile(r"\w+(?:me|te|se|nos)(?:lo|la|los|las)|\w*[áéíóú]\w*[aeií](?:lo|la|los|las|le|les)")
+
+STOPWORDS = {
+    "el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del", "al", "a", "en", "y", "o", "que",
+    "qué", "es", "son", "por", "para", "con", "sin", "se", "su", "sus", "me", "mi", "lo", "le", "como",
+    "cómo", "cuál", "cual", "cuáles", "cuando", "cuándo", "donde", "dónde", "quién", "quien", "hay",
+    "muy", "más", "mas", "no", "sí", "si", "ser", "explica", "explícame", "dime",
+    "the", "a", "an", "of", "in", "on", "to", "and", "or", "is", "are", "what", "how", "why", "which",
+    "who", "when", "where", "does", "do", "can", "for", "with", "about", "explain", "me",
+}
+
+# Mínimo de palabras con contenido para considerar la pregunta autocontenida
+MIN_CONTENT_WORDS = 4
+# Solapamiento léxico con el turno anterior a partir del cual no hace falta reformular
+MIN_OVERLAP = 0.5
+# Similitud léxica a partir de la cual la reformulación equivale a la pregunta original
+EQUIVALENT_SIMILARITY = 0.8
+
+_stats = {NO_HISTORY: 0, DIRECT: 0, REPHRASE: 0, "speculative_raw": 0, "speculative_rephrased": 0}
+_stats_lock = threading.Lock()
+
+
+def _words(text: str):
+    return re.findall(r"\w+", text.lower())
+
+
+def content_words(text: str) -> set:
+    return {word for word in _words(text) if word not in STOPWORDS}
+
+
+def lexical_similarity(a: str, b: str) -> float:
+    """
+    Similitud de Jaccard entre las palabras con contenido de dos textos.
+    """
+    words_a, words_b = content_words(a), content_words(b)
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+def _has_anaphora(words: list) -> bool:
+    if words and words[0] in CONTINUATIONS:
+        return True
+    return any(word in ANAPHORA or ENCLITIC.fullmatch(word) for word in words)
+
+
+def _last_user_turn(chat_history) -> str:
+    for role, content in reversed(chat_history):
+        if role in ("human", "user"):
+            return content
+    return ""
+
+
+def classify(query: str, chat_history) -> str:
+    """
+    Decide, con una heurística local, si la pregunta necesita reformularse con el historial.
+
+    Returns:
+        str: NO_HISTORY o DIRECT (usar la pregunta tal cual), REPHRASE (hay
+             anáforas: reformular) o UNSURE (reformular y recuperar en paralelo).
+    """
+    if not chat_history:
+        return NO_HISTORY
+
+    words = _words(query)
+    if _has_anaphora(words):
+        return REPHRASE
+
+    query_content = content_words(query)
+    previous_content = content_words(_last_user_turn(chat_history))
+    overlap = len(query_content & previous_content) / len(previous_content) if previous_content else 0.0
+
+    if len(query_content) >= MIN_CONTENT_WORDS or overlap >= MIN_OVERLAP:
+        return DIRECT
+    return UNSURE
+
+
+def record(path: str):
+    with _stats_lock:
+        _stats[path] += 1
+
+
+def stats() -> dict:
+    """
+    Devuelve cuántas preguntas tomó cada camino (y su proporción sobre el total).
+    """
+    with _stats_lock:
+        counts = dict(_stats)
+    total = sum(counts.values())
+    return {
+        "counts": counts,
+        "ratios": {path: count / total if total else 0.0 for path, count in counts.items()},
+        "total": total
+    }
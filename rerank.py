@@ -0,0 +1,82 @@
+import numpy as np
+
+from lexical_index import tokenize
+
+# Peso de la puntuación léxica local al reordenar (la semántica pesa 1 - RERANK_WEIGHT)
+RERANK_WEIGHT = 0.3
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def cosine_scores(query_vector, vectors) -> np.ndarray:
+    """
+    Similitud coseno de la pregunta con cada vector candidato.
+    """
+    query = _normalize_rows(np.asarray(query_vector, dtype=np.float32))
+    return _normalize_rows(np.asarray(vectors, dtype=np.float32)) @ query
+
+
+def term_coverage(query: str, texts: list) -> np.ndarray:
+    """
+    Puntuación léxica local de cada texto: fracción de los términos de la
+    pregunta que aparecen en él (premia fórmulas, números y nombres exactos).
+    """
+    query_terms = set(tokenize(query))
+    if not query_terms:
+        return np.zeros(len(texts), dtype=np.float32)
+    return np.array(
+        [len(query_terms & set(tokenize(text))) / len(query_terms) for text in texts],
+        dtype=np.float32
+    )
+
+
+def rerank_scores(query: str, query_vector, vectors, texts: list) -> np.ndarray:
+    """
+    Relevancia combinada de cada candidato: similitud coseno y cobertura de términos.
+    """
+    return (1 - RERANK_WEIGHT) * cosine_scores(query_vector, vectors) + RERANK_WEIGHT * term_coverage(query, texts)
+
+
+def mmr(query_vector, vectors, k: int, lambda_mult: float = 0.5, relevance=None) -> list:
+    """
+    Selecciona `k` candidatos con Maximal Marginal Relevance.
+
+    En cada paso se elige el candidato que maximiza
+    `lambda_mult * relevancia - (1 - lambda_mult) * máxima similitud con los ya elegidos`,
+    de modo que los fragmentos casi duplicados (p. ej. solapados de la misma
+    página) se descartan en favor de otros que aporten información nueva.
+
+    Args:
+        query_vector: Embedding de la pregunta.
+        vectors: Matriz (n, d) con los embeddings de los candidatos.
+        k (int): Número de candidatos a seleccionar.
+        lambda_mult (float): 1 = solo relevancia, 0 = solo diversidad.
+        relevance: Relevancia de cada candidato (por defecto, similitud coseno con la pregunta).
+
+    Returns:
+        list: Índices de los candidatos seleccionados, en orden de selección.
+    """
+    matrix = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+    if not len(matrix) or k <= 0:
+        return []
+    if relevance is None:
+        relevance = cosine_scores(query_vector, matrix)
+    relevance = np.asarray(relevance, dtype=np.float32)
+
+    selected = [int(np.argmax(relevance))]
+    # Máxima similitud de cada candidato con los ya seleccionados
+    redundancy = matrix @ matrix[selected[0]]
+    available = np.ones(len(matrix), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < min(k, len(matrix)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, matrix @ matrix[best])
+    return selected
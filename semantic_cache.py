@@ -0,0 +1,89 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Caché semántica de respuestas de un índice.
+
+    Una entrada se reutiliza cuando la pregunta nueva tiene una similitud coseno
+    con la pregunta cacheada mayor o igual que `threshold` y se recuperó
+    exactamente el mismo contexto. Las entradas caducan a los `ttl` segundos y,
+    por encima de `max_entries`, se desaloja la usada hace más tiempo.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl: float = 86400, max_entries: int = 500):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self):
+        now = time.time()
+        for key in [key for key, entry in self._entries.items() if now - entry["created_at"] > self.ttl]:
+            del self._entries[key]
+
+    def lookup(self, vector, context_key: tuple):
+        """
+        Busca una respuesta para la pregunta `vector` con el contexto `context_key`.
+
+        Returns:
+            dict: {"result", "source_documents", "similarity"} o None si no hay acierto.
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            self._expire()
+            candidates = [(key, entry) for key, entry in self._entries.items() if entry["context_key"] == context_key]
+            if candidates:
+                matrix = np.stack([entry["vector"] for _, entry in candidates])
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return {
+                        "result": entry["result"],
+                        "source_documents": entry["source_documents"],
+                        "similarity": float(similarities[best])
+                    }
+            self.misses += 1
+            return None
+
+    def store(self, vector, context_key: tuple, result: str, source_documents: list):
+        with self._lock:
+            self._entries[object()] = {
+                "vector": self._normalize(vector),
+                "context_key": context_key,
+                "result": result,
+                "source_documents": source_documents,
+                "created_at": time.time()
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries)
+            }
@@ -0,0 +1,52 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def atomic_write_json(path: str, obj, indent: int = 2):
+    """
+    Guarda `obj` como JSON de forma atómica (escritura en temporal + rename):
+    una escritura interrumpida nunca deja el archivo a medias.
+
+    Args:
+        path (str): Ruta del archivo. Su carpeta se crea si no existe.
+        obj: Objeto serializable a JSON.
+        indent (int): Sangría del JSON (None para la forma compacta).
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=indent)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path: str, shared: bool = False):
+    """
+    Bloqueo entre procesos (p. ej. la aplicación y `ingest_cli`) sobre un
+    archivo `.lock`. Con `shared=True` varios lectores pueden tenerlo a la vez.
+
+    En sistemas sin `fcntl` (Windows) no bloquea: solo protege el lock de hilo
+    de cada módulo.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
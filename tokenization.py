@@ -0,0 +1,55 @@
+import logging
+from functools import lru_cache
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Modelo cuyo tokenizador se usa por defecto
+TOKENIZER_MODEL = "gpt-4o-mini"
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Sin red tiktoken no puede descargar la codificación la primera vez
+        logger.warning(f"Tokenizador no disponible, se estimarán los tokens: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = TOKENIZER_MODEL) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@lru_cache(maxsize=None)
+def token_counter(model: str = TOKENIZER_MODEL):
+    """
+    Devuelve una función texto -> número de tokens para `model`. Equivale a
+    `count_tokens`, pero sin la sobrecarga por llamada (p. ej. para el splitter,
+    que mide cada palabra).
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return lambda text: len(text) // 4 + 1
+    encode = encoding.encode_ordinary
+    return lambda text: len(encode(text))
+
+
+def split_by_tokens(text: str, max_tokens: int, model: str = TOKENIZER_MODEL) -> list:
+    """
+    Divide un texto en trozos consecutivos de como mucho `max_tokens` tokens
+    (sin tokenizador, según la misma estimación que `count_tokens`).
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        size = max(1, (max_tokens - 1) * 4)
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    tokens = encoding.encode(text, disallowed_special=())
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
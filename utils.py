@@ -1,26 +1,43 @@
-import tempfile
 import os
+import asyncio
+import mimetypes
+import hashlib
+import shutil
+import tempfile
+import threading
+import weakref
+import time
 import logging
+from collections import deque
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import List
 from dotenv import load_dotenv
 load_dotenv()
 
-from pinecone import Pinecone
+import numpy as np
 from streamlit.runtime.uploaded_file_manager import UploadedFile
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
-from langchain_pinecone import PineconeVectorStore
-from langchain_community.document_loaders import (
-    PyMuPDFLoader,
-    TextLoader,
-    UnstructuredMarkdownLoader
-)
-from langchain.chains.history_aware_retriever import create_history_aware_retriever
-from langchain.chains.retrieval import create_retrieval_chain
+from langchain_core.documents import Document
 from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.output_parsers import StrOutputParser
 from langchain_openai import ChatOpenAI
-from langchain import hub
 
+import assistant_config
+import document_loaders
+import manifest
+import metrics
+import query_rewrite
+from chat_history import ChatHistory
+from tokenization import count_tokens, split_by_tokens, token_counter
+from prompts import REPHRASE_PROMPT, RETRIEVAL_QA_CHAT_PROMPT, SUMMARY_PROMPT
+from embedding_cache import CachedEmbeddings
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+import rerank
+from semantic_cache import SemanticCache
+from vector_backends import VECTOR_BACKEND, VectorBackend, create_backend
 
 
 
@@ -32,9 +49,761 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSION = 1536
+# Máximo de tokens por texto que acepta el modelo de embeddings
+EMBEDDING_MAX_INPUT_TOKENS = 8191
+CHAT_MODEL = "gpt-4o-mini"
+
+# Ingesta: tamaño de los chunks y solapamiento, en tokens del modelo de embeddings
+INGEST_CHUNK_TOKENS = int(os.getenv("INGEST_CHUNK_TOKENS", "256"))
+INGEST_CHUNK_OVERLAP_TOKENS = int(os.getenv("INGEST_CHUNK_OVERLAP_TOKENS", "16"))
+# Lotes de embedding: presupuesto de tokens por petición (la API admite 300.000), máximo de
+# chunks por lote y lotes procesándose en paralelo
+INGEST_BATCH_TOKENS = int(os.getenv("INGEST_BATCH_TOKENS", "25000"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "4"))
+# Máximo de lotes en memoria a la vez durante la ingesta
+INGEST_WINDOW = int(os.getenv("INGEST_WINDOW", "8"))
+# Parseo en paralelo: procesos, páginas de PDF por tarea y tamaño mínimo de la subida para usar el pool
+INGEST_PARSE_WORKERS = int(os.getenv("INGEST_PARSE_WORKERS", str(os.cpu_count() or 1)))
+INGEST_PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "50"))
+INGEST_PARSE_POOL_MIN_BYTES = 2 * 1024 * 1024
+# Extensiones de archivo que se pueden ingerir
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".txt", ".md", ".html")
+# Clave de metadatos donde se guarda el texto del chunk (la misma que usa PineconeVectorStore)
+TEXT_KEY = "text"
+PINECONE_UPSERT_BATCH_SIZE = 32
+# Lectura por ID: IDs por petición fetch
+PINECONE_FETCH_BATCH_SIZE = 100
+# Segundos que se reutilizan el listado de índices y sus estadísticas
+INDEX_CACHE_TTL = float(os.getenv("INDEX_CACHE_TTL", "30"))
+# Llamadas de red asíncronas en curso a la vez en el proceso (embeddings, backend de vectores, modelo)
+ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", "16"))
+# Preguntas respondidas a la vez por `run_llm_batch`
+BATCH_QA_CONCURRENCY = int(os.getenv("BATCH_QA_CONCURRENCY", "8"))
+embeddings = CachedEmbeddings(OpenAIEmbeddings(model=EMBEDDING_MODEL), model_name=EMBEDDING_MODEL)
+
+
+# Registro de clientes compartido por todas las sesiones de Streamlit del proceso
+_vector_backend = None
+_chat_models = {}
+_rag_chains = {}
+_semantic_caches = {}
+_lexical_indexes = {}
+_index_cache = {}
+_parse_pool = None
+_parse_pool_workers = 0
+_async_loop = None
+_async_limiters = weakref.WeakKeyDictionary()
+_registry_lock = threading.Lock()
+
+
+def get_vector_backend() -> VectorBackend:
+    """
+    Devuelve el backend de vectores del proceso (VECTOR_BACKEND), creándolo la primera vez.
+    """
+    global _vector_backend
+    with _registry_lock:
+        if _vector_backend is None:
+            _vector_backend = create_backend(VECTOR_BACKEND)
+            logger.info(f"Backend de vectores: {_vector_backend.name}")
+        return _vector_backend
+
+
+def set_vector_backend(backend: VectorBackend):
+    """
+    Sustituye el backend de vectores del proceso (p. ej. en scripts o benchmarks).
+    """
+    global _vector_backend
+    with _registry_lock:
+        _vector_backend = backend
+
+
+def get_chat_model(model: str = CHAT_MODEL, temperature: float = 0):
+    """
+    Devuelve el ChatOpenAI reutilizable para la configuración indicada.
+    """
+    key = (model, temperature)
+    with _registry_lock:
+        if key not in _chat_models:
+            _chat_models[key] = ChatOpenAI(verbose=True, temperature=temperature, model=model)
+        return _chat_models[key]
+
+
+def get_rag_chains(index_name: str, model: str = CHAT_MODEL, temperature: float = 0):
+    """
+    Devuelve las cadenas RAG del índice, construyéndolas solo la primera vez
+    para cada configuración de modelo:
+
+        "rephrase": reformula la pregunta como pregunta independiente usando el historial.
+        "answer": genera la respuesta a partir de la pregunta, el historial y el contexto.
+    """
+    key = (index_name, model, temperature)
+    with _registry_lock:
+        if key in _rag_chains:
+            return _rag_chains[key]
+
+    chat = get_chat_model(model, temperature)
+    chains = {
+        "rephrase": REPHRASE_PROMPT | chat | StrOutputParser(),
+        "answer": create_stuff_documents_chain(chat, RETRIEVAL_QA_CHAT_PROMPT)
+    }
+
+    with _registry_lock:
+        return _rag_chains.setdefault(key, chains)
+
+
+def get_semantic_cache(index_name: str, config: dict) -> SemanticCache:
+    """
+    Devuelve la caché semántica de respuestas del índice con los parámetros de `config`.
+    """
+    params = (config["semantic_cache_threshold"], config["semantic_cache_ttl"], config["semantic_cache_max_entries"])
+    with _registry_lock:
+        cache = _semantic_caches.get(index_name)
+        if cache is None or (cache.threshold, cache.ttl, cache.max_entries) != params:
+            cache = _semantic_caches[index_name] = SemanticCache(*params)
+        return cache
+
+
+def get_lexical_index(index_name: str) -> LexicalIndex:
+    """
+    Devuelve el índice BM25 del asistente, cargándolo de disco la primera vez
+    (o reconstruyéndolo desde el backend si el asistente es anterior a él) y
+    recargándolo si otro proceso lo ha modificado desde entonces.
+    """
+    with _registry_lock:
+        lexical = _lexical_indexes.get(index_name)
+    if lexical is not None:
+        lexical.refresh()
+        return lexical
+
+    lexical = LexicalIndex.load(index_name)
+    if lexical is None:
+        lexical = _rebuild_lexical_index(index_name)
+
+    with _registry_lock:
+        return _lexical_indexes.setdefault(index_name, lexical)
+
+
+def _get_async_loop() -> asyncio.AbstractEventLoop:
+    """
+    Devuelve el bucle de eventos en segundo plano donde se ejecutan las
+    variantes síncronas de la API, creándolo la primera vez. Es único en el
+    proceso para que las sesiones compartan las conexiones de los clientes asíncronos.
+    """
+    global _async_loop
+    with _registry_lock:
+        if _async_loop is None:
+            _async_loop = asyncio.new_event_loop()
+            threading.Thread(target=_async_loop.run_forever, name="utils-async", daemon=True).start()
+        return _async_loop
+
+
+def _get_async_limiter() -> asyncio.Semaphore:
+    """
+    Devuelve el limitador compartido (ASYNC_CONCURRENCY llamadas de red a la vez)
+    del bucle de eventos en curso.
+    """
+    loop = asyncio.get_running_loop()
+    with _registry_lock:
+        if loop not in _async_limiters:
+            _async_limiters[loop] = asyncio.Semaphore(ASYNC_CONCURRENCY)
+        return _async_limiters[loop]
+
+
+def _submit_async(coro):
+    """
+    Lanza una corrutina en el bucle en segundo plano.
+
+    Returns:
+        concurrent.futures.Future: Futuro con el resultado de la corrutina.
+    """
+    loop = _get_async_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("No se puede esperar una función síncrona desde el bucle de eventos; usa su variante async")
+    return asyncio.run_coroutine_threadsafe(coro, loop)
+
+
+def _run_sync(coro):
+    """
+    Ejecuta una corrutina en el bucle en segundo plano y espera su resultado
+    (base de las variantes síncronas de la API).
+    """
+    return _submit_async(coro).result()
+
 
-def ingest_docs(uploaded_files: List[UploadedFile], assistant_id: str, index_name, delete_existing_files=False):
+def _iter_sync(agen):
+    """
+    Recorre un generador asíncrono desde código síncrono, evento a evento.
+    """
+    try:
+        while True:
+            try:
+                yield _run_sync(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        _run_sync(agen.aclose())
+
+
+def get_metrics_text() -> str:
+    """
+    Devuelve las métricas por etapa del proceso en formato de texto de Prometheus.
+    """
+    return metrics.render_prometheus()
+
+
+def start_metrics_server():
+    """
+    Expone las métricas en /metrics si METRICS_PORT está definido (ver `metrics`).
+    """
+    metrics.start_metrics_server()
+
+
+def get_rephrase_stats() -> dict:
+    """
+    Devuelve cuántas preguntas tomó cada camino de reformulación (ver `query_rewrite`).
+    """
+    return query_rewrite.stats()
+
+
+def get_assistant_config(index_name: str) -> dict:
+    """
+    Devuelve la configuración del asistente (ver `assistant_config.DEFAULT_CONFIG`).
+    """
+    return assistant_config.get_config(index_name)
+
+
+def update_assistant_config(index_name: str, **changes) -> dict:
+    """
+    Actualiza la configuración del asistente y devuelve la configuración resultante.
+    """
+    return assistant_config.update_config(index_name, **changes)
+
+
+def get_semantic_cache_stats(index_name: str) -> dict:
+    """
+    Devuelve aciertos, fallos y entradas de la caché semántica del índice (vacío si no se ha usado).
+    """
+    with _registry_lock:
+        cache = _semantic_caches.get(index_name)
+    return cache.stats() if cache is not None else {}
+
+
+def invalidate_answers(index_name: str):
+    """
+    Vacía la caché semántica de un índice cuando cambia su contenido.
+    """
+    with _registry_lock:
+        cache = _semantic_caches.get(index_name)
+    if cache is not None:
+        cache.clear()
+        logger.info(f"Caché semántica del índice {index_name} invalidada")
+
+
+def _cached_index_info(key):
+    with _registry_lock:
+        entry = _index_cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
+def _cache_index_info(key, value):
+    with _registry_lock:
+        _index_cache[key] = (time.monotonic() + INDEX_CACHE_TTL, value)
+
+
+def invalidate_index_cache(index_name: str = None):
+    """
+    Descarta el listado de índices cacheado y las estadísticas de `index_name`
+    (de todos los índices si no se indica). Se llama al crear o eliminar un
+    índice y al cambiar sus vectores.
+    """
+    with _registry_lock:
+        _index_cache.pop("indexes", None)
+        for key in [key for key in _index_cache if key[0] == "stats" and index_name in (None, key[1])]:
+            del _index_cache[key]
+
+
+def invalidate_index(index_name: str):
+    """
+    Descarta los handles y cadenas cacheados de un índice (p. ej. tras eliminarlo).
+    """
+    get_vector_backend().invalidate(index_name)
+    invalidate_index_cache(index_name)
+    with _registry_lock:
+        for key in [key for key in _rag_chains if key[0] == index_name]:
+            del _rag_chains[key]
+        _semantic_caches.pop(index_name, None)
+        _lexical_indexes.pop(index_name, None)
+
+
+def _log_embedding_cache_stats(before: dict):
+    """
+    Registra los aciertos y fallos de la caché de embeddings desde `before`.
+    """
+    after = embeddings.stats()
+    hits = after["hits"] - before["hits"]
+    misses = after["misses"] - before["misses"]
+    logger.info(f"Caché de embeddings: {hits} aciertos, {misses} fallos ({after['entries']} entradas)")
+
+
+def _embedding_tokens(text: str) -> int:
+    return token_counter(EMBEDDING_MODEL)(text)
+
+
+def _doc_tokens(doc) -> int:
+    # Los chunks de la ingesta traen sus tokens contados en el parseo (ver `_parse_task`)
+    return doc.metadata.get("tokens") or _embedding_tokens(doc.page_content)
+
+
+async def _aembed_and_upsert_batch(index_name: str, batch: list, ids: List[str]):
+    """
+    Calcula los embeddings de un lote y lo sube al índice con los IDs dados.
+    """
+    texts = [doc.page_content for doc in batch]
+    limiter = _get_async_limiter()
+    async with limiter:
+        with metrics.span("embed", chunks=len(batch), tokens=sum(_doc_tokens(doc) for doc in batch)):
+            vectors = await embeddings.aembed_documents(texts)
+    async with limiter:
+        with metrics.span("upsert", chunks=len(batch)):
+            await get_vector_backend().aupsert(
+                index_name, ids, vectors,
+                [{**doc.metadata, TEXT_KEY: doc.page_content} for doc in batch],
+                batch_size=PINECONE_UPSERT_BATCH_SIZE
+            )
+
+
+def _embed_and_upsert_batch(index_name: str, batch: list, ids: List[str]):
+    _run_sync(_aembed_and_upsert_batch(index_name, batch, ids))
+
+
+def _iter_batches(documents, batch_size: int, batch_tokens: int):
+    """
+    Agrupa un iterable de chunks en lotes sin materializarlo: cada lote se
+    llena hasta `batch_tokens` tokens o `batch_size` chunks, lo que llegue antes.
+    """
+    batch = []
+    tokens = 0
+    for doc in documents:
+        doc_tokens = _doc_tokens(doc)
+        if batch and tokens + doc_tokens > batch_tokens:
+            yield batch
+            batch, tokens = [], 0
+        batch.append(doc)
+        tokens += doc_tokens
+        if len(batch) == batch_size:
+            yield batch
+            batch, tokens = [], 0
+    if batch:
+        yield batch
+
+
+def _run_ingest_pipeline(index_name: str, documents, batch_size: int, batch_tokens: int, max_workers: int,
+                         window: int, on_batch_done):
+    """
+    Embebe y sube los chunks por lotes con concurrencia acotada: mientras un
+    lote se sube al índice, los siguientes ya se están embebiendo. Los lotes
+    se ejecutan como corrutinas en el bucle en segundo plano, con hasta
+    `max_workers` a la vez.
+
+    `documents` puede ser un generador; como mucho hay `window` lotes en vuelo,
+    de modo que la memoria no depende del tamaño total de la subida.
+
+    Los IDs son deterministas (ver `chunk_id`) y `on_batch_done(batch, ids)` se
+    llama en orden de lote. Ante el primer error no se lanzan más lotes, se
+    esperan los que estén en curso y se lanza un RuntimeError con el informe de
+    los lotes fallidos.
+
+    Returns:
+        int: Número de chunks procesados.
+    """
+    pending = deque()
+    failures = []
+    total_chunks = 0
+
+    def drain_oldest():
+        batch_number, start, batch, ids, future = pending.popleft()
+        try:
+            future.result()
+            on_batch_done(batch, ids)
+        except Exception as e:
+            failures.append(f"lote {batch_number} (documentos {start + 1}-{start + len(batch)}): {e}")
+
+    workers = asyncio.Semaphore(max_workers)
+
+    async def run_batch(batch, ids):
+        async with workers:
+            await _aembed_and_upsert_batch(index_name, batch, ids)
+
+    try:
+        for batch_number, batch in enumerate(_iter_batches(documents, batch_size, batch_tokens), 1):
+            if failures:
+                break
+            logger.info(f"Procesando lote {batch_number} (documentos {total_chunks + 1}-{total_chunks + len(batch)})")
+
+            ids = [chunk_id(doc) for doc in batch]
+            future = _submit_async(run_batch(batch, ids))
+            pending.append((batch_number, total_chunks, batch, ids, future))
+            total_chunks += len(batch)
+
+            # Limitar los lotes en vuelo para acotar la memoria
+            while len(pending) >= window:
+                drain_oldest()
+    finally:
+        # Esperar a los lotes en curso aunque falle la carga de un archivo
+        while pending:
+            drain_oldest()
+
+    if failures:
+        raise RuntimeError(f"Fallaron {len(failures)} lotes: " + "; ".join(failures))
+    return total_chunks
+
+
+def _pdf_page_metadata(pdf, source: str) -> dict:
+    """
+    Metadatos comunes a todas las páginas de un PDF, con el mismo formato que PyMuPDFLoader.
+    """
+    metadata = {"source": source, "file_path": source, "total_pages": len(pdf)}
+    for key, value in (pdf.metadata or {}).items():
+        if isinstance(value, (str, int, float, bool)):
+            metadata[key] = value
+    return metadata
+
+
+def _iter_file_pages(name: str, source: str, path: str, page_range=None):
+    """
+    Carga un archivo de disco página a página.
+
+    Los PDF se recorren de forma perezosa con PyMuPDF y los DOCX y HTML sección
+    a sección (ver `document_loaders`); el resto de formatos produce un único
+    documento.
+
+    Args:
+        name (str): Nombre del archivo (determina el formato).
+        source (str): Ruta con la que se registra el archivo en los metadatos.
+        path (str): Ruta del archivo que se lee (la de `source` o una copia temporal).
+        page_range (tuple): Rango [inicio, fin) de páginas a cargar de un PDF.
+
+    Yields:
+        Document: Una página, una sección o el archivo completo, con sus metadatos.
+    """
+    if name.endswith('.pdf'):
+        import fitz
+
+        # PyMuPDF lee del archivo solo las páginas que se piden
+        with fitz.open(path, filetype="pdf") as pdf:
+            base_metadata = _pdf_page_metadata(pdf, source)
+            start, end = page_range or (0, len(pdf))
+            for page_number in range(start, end):
+                yield Document(page_content=pdf[page_number].get_text(), metadata={**base_metadata, "page": page_number})
+        return
+
+    with open(path, "rb") as f:
+        data = f.read()
+    if name.endswith('.md'):
+        from unstructured.partition.md import partition_md
+
+        elements = partition_md(text=data.decode("utf-8"))
+        yield Document(page_content="\n\n".join(str(el) for el in elements), metadata={"source": source})
+    elif name.endswith('.docx'):
+        yield from document_loaders.iter_docx(data, source)
+    elif name.endswith('.html'):
+        yield from document_loaders.iter_html(data, source)
+    elif name.endswith('.txt'):
+        yield Document(page_content=data.decode("utf-8"), metadata={"source": source})
+    else:
+        logger.warning(f"Tipo de archivo no soportado: {name}")
+
+
+def _get_text_splitter():
+    # Tamaño medido en tokens del modelo de embeddings, no en caracteres
+    return RecursiveCharacterTextSplitter(
+        chunk_size=min(INGEST_CHUNK_TOKENS, EMBEDDING_MAX_INPUT_TOKENS),
+        chunk_overlap=INGEST_CHUNK_OVERLAP_TOKENS,
+        length_function=token_counter(EMBEDDING_MODEL),
+    )
+
+
+def _split_page(text_splitter, page: Document) -> list:
+    """
+    Divide una página en chunks y anota en `tokens` los tokens de cada uno.
+
+    Los trozos que aun así superan EMBEDDING_MAX_INPUT_TOKENS (texto sin
+    separadores) se parten por tokens para que la API no los rechace.
+    """
+    chunks = []
+    for chunk in text_splitter.split_documents([page]):
+        tokens = _embedding_tokens(chunk.page_content)
+        if tokens <= EMBEDDING_MAX_INPUT_TOKENS:
+            chunk.metadata["tokens"] = tokens
+            chunks.append(chunk)
+            continue
+        for piece in split_by_tokens(chunk.page_content, EMBEDDING_MAX_INPUT_TOKENS, model=EMBEDDING_MODEL):
+            chunks.append(Document(page_content=piece, metadata={**chunk.metadata,
+                                                                 "tokens": _embedding_tokens(piece)}))
+    return chunks
+
+
+def _plan_parse_tasks(name: str, source: str, path: str):
+    """
+    Divide un archivo en tareas de parseo: rangos de INGEST_PAGES_PER_TASK
+    páginas para los PDF y una única tarea para el resto de formatos.
+
+    Las tareas llevan la ruta del archivo y no su contenido: cada proceso del
+    pool abre el archivo por su cuenta, de modo que un PDF grande no se copia
+    en la cola ni se guarda en memoria una vez por tarea en vuelo.
+
+    Yields:
+        tuple: Argumentos (name, source, path, page_range) para `_parse_task`.
+    """
+    if name.endswith('.pdf'):
+        import fitz
+
+        with fitz.open(path, filetype="pdf") as pdf:
+            total_pages = len(pdf)
+        for start in range(0, total_pages, INGEST_PAGES_PER_TASK):
+            yield (name, source, path, (start, min(start + INGEST_PAGES_PER_TASK, total_pages)))
+    else:
+        yield (name, source, path, None)
+
+
+def _parse_task(name: str, source: str, path: str, page_range=None):
+    """
+    Carga y divide en chunks (una parte de) un archivo. Se ejecuta en el pool de procesos.
+
+    Cada chunk recibe en `chunk_index` su posición dentro de la página (o sección) y en
+    `tokens` su tamaño en tokens del modelo de embeddings.
+
+    Returns:
+        tuple: (chunks en orden de página, {"load", "split", "pages"}) con los
+               segundos dedicados a cargar y a dividir y las páginas cargadas.
+    """
+    text_splitter = _get_text_splitter()
+    chunks = []
+    stats = {"load": 0.0, "split": 0.0, "pages": 0}
+    pages = _iter_file_pages(name, source, path, page_range)
+    while True:
+        start = time.perf_counter()
+        page = next(pages, None)
+        stats["load"] += time.perf_counter() - start
+        if page is None:
+            break
+        stats["pages"] += 1
+
+        start = time.perf_counter()
+        for chunk_index, chunk in enumerate(_split_page(text_splitter, page)):
+            chunk.metadata["chunk_index"] = chunk_index
+            chunks.append(chunk)
+        stats["split"] += time.perf_counter() - start
+    return chunks, stats
+
+
+def file_id_prefix(filename: str) -> str:
+    """
+    Prefijo común de los IDs de todos los chunks de un archivo.
+    """
+    return hashlib.sha256(filename.encode("utf-8")).hexdigest()[:16] + "-"
+
+
+def chunk_id(doc) -> str:
+    """
+    ID determinista de un chunk a partir de (archivo, posición, hash del contenido).
+
+    La posición es (página, índice dentro de la página), de modo que editar una
+    página solo cambia los IDs de los chunks de esa página. En DOCX y HTML la
+    sección hace el papel de la página.
+    """
+    page = int(doc.metadata.get("page", doc.metadata.get("section", 0)))
+    chunk_index = int(doc.metadata.get("chunk_index", 0))
+    content_hash = hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()[:16]
+    return f"{file_id_prefix(doc.metadata['filename'])}{page:05d}-{chunk_index:04d}-{content_hash}"
+
+
+def _get_parse_pool(parse_workers: int):
+    """
+    Devuelve el pool de procesos de parseo del proceso, creándolo la primera vez.
+    """
+    global _parse_pool, _parse_pool_workers
+    with _registry_lock:
+        if _parse_pool is None or _parse_pool_workers != parse_workers:
+            if _parse_pool is not None:
+                _parse_pool.shutdown(wait=False)
+            # spawn: hacer fork de un proceso con hilos (Streamlit) no es seguro
+            _parse_pool = ProcessPoolExecutor(max_workers=parse_workers,
+                                              mp_context=multiprocessing.get_context("spawn"))
+            _parse_pool_workers = parse_workers
+        return _parse_pool
+
+
+def _discard_parse_pool(pool):
+    """
+    Descarta un pool de parseo roto (un proceso murió) para que se cree otro.
+    """
+    global _parse_pool
+    with _registry_lock:
+        # Otra ingesta puede haberlo reemplazado ya
+        if _parse_pool is pool:
+            _parse_pool = None
+    pool.shutdown(wait=False)
+
+
+def _iter_parsed_chunks(tasks, parse_workers: int):
+    """
+    Ejecuta las tareas de parseo (en el pool si `parse_workers` > 1) y devuelve
+    sus resultados en el mismo orden en que se plantearon, con como mucho
+    2 * parse_workers tareas en vuelo.
+
+    Los tiempos de carga y división medidos en cada tarea se registran como
+    etapas `load` y `split` (ver `metrics`). Si un proceso del pool muere, las
+    tareas en vuelo se reintentan una vez en un pool nuevo.
+
+    Yields:
+        tuple: (tarea, chunks)
+    """
+    def parsed(task, result):
+        chunks, stats = result
+        metrics.record("load", stats["load"], pages=stats["pages"])
+        metrics.record("split", stats["split"], chunks=len(chunks))
+        return task, chunks
+
+    if parse_workers <= 1:
+        for task in tasks:
+            yield parsed(task, _parse_task(*task))
+        return
+
+    pool = _get_parse_pool(parse_workers)
+    pending = deque()
+    retried = False
+
+    def recover():
+        # Un proceso del pool murió (PDF que lo tumba, falta de memoria...):
+        # se reintentan una vez en un pool nuevo las tareas en vuelo
+        nonlocal pool, retried
+        _discard_parse_pool(pool)
+        if retried:
+            # Segundo fallo: el pool ya está descartado para la próxima ingesta
+            raise
+        retried = True
+        logger.warning(f"El pool de parseo se ha roto; reintentando {len(pending)} tareas en uno nuevo")
+        pool = _get_parse_pool(parse_workers)
+        for i, (pending_task, _) in enumerate(pending):
+            pending[i] = (pending_task, pool.submit(_parse_task, *pending_task))
+
+    def submit(task):
+        while True:
+            try:
+                pending.append((task, pool.submit(_parse_task, *task)))
+                return
+            except BrokenProcessPool:
+                recover()
+
+    def result():
+        while True:
+            task, future = pending[0]
+            try:
+                chunks = future.result()
+                break
+            except BrokenProcessPool:
+                recover()
+        pending.popleft()
+        return parsed(task, chunks)
+
+    try:
+        for task in tasks:
+            submit(task)
+            if len(pending) >= 2 * parse_workers:
+                yield result()
+        while pending:
+            yield result()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def file_sha256(path: str) -> str:
+    """
+    Hash SHA-256 del contenido de un archivo, leído por bloques.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _spool_upload(uploaded_file, directory: str) -> str:
+    """
+    Guarda en `directory` un archivo subido que solo está en memoria (UploadedFile)
+    para que los procesos de parseo lo lean por ruta.
+
+    Returns:
+        str: Ruta del archivo guardado.
+    """
+    fd, path = tempfile.mkstemp(dir=directory, suffix=os.path.splitext(uploaded_file.name)[1])
+    with os.fdopen(fd, "wb") as f:
+        f.write(uploaded_file.getvalue())
+    return path
+
+
+class StoredFile:
+    """
+    Archivo guardado en disco con la interfaz de UploadedFile que usa `ingest_docs`
+    (para ingerir fuera de Streamlit: trabajos en segundo plano, línea de comandos...).
+    """
+
+    def __init__(self, path: str, name: str = None, type: str = None):
+        self.path = path
+        self.name = name or os.path.basename(path)
+        self.type = type or mimetypes.guess_type(self.name)[0] or "application/octet-stream"
+        self.size = os.path.getsize(path)
+
+    def getvalue(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+def ingest_docs(uploaded_files: List[UploadedFile], assistant_id: str, index_name, delete_existing_files=False,
+                batch_size: int = None, max_workers: int = None, window: int = None, parse_workers: int = None,
+                skip_ids=None, progress=None, cancel_event: threading.Event = None, batch_tokens: int = None):
+    """
+    Carga, divide, embebe y sube los archivos a un índice (creándolo si no existe).
+
+    Los archivos se procesan uno a uno como un flujo de páginas y chunks, de
+    modo que la memoria está acotada por `window` lotes en vuelo y no por el
+    tamaño total de la subida. El parseo de varios archivos, y de rangos de
+    páginas de PDF grandes, se reparte en un pool de procesos y sus resultados
+    se consumen en orden determinista.
+
+    Args:
+        uploaded_files (List[UploadedFile]): Archivos a ingerir.
+        assistant_id (str): Identificador del asistente que se guarda en los metadatos.
+        index_name (str): Nombre del índice.
+        delete_existing_files (bool): Si es True, reemplaza la versión previa de cada archivo: solo se
+            embeben y suben los chunks nuevos o modificados y se eliminan por ID los que desaparecen.
+        batch_size (int): Máximo de chunks por lote de embedding (por defecto INGEST_BATCH_SIZE).
+        max_workers (int): Lotes procesándose en paralelo (por defecto INGEST_MAX_WORKERS).
+        window (int): Máximo de lotes en memoria (por defecto INGEST_WINDOW).
+        parse_workers (int): Procesos de parseo (por defecto INGEST_PARSE_WORKERS).
+        skip_ids (set): IDs de chunks que ya están en el índice (p. ej. subidos en un intento
+            interrumpido); no se vuelven a embeber ni subir, pero se registran en el manifiesto.
+        progress (callable): Se llama con un dict por cada avance:
+            {"event": "parsed", "filename", "chunks", "pages"} al dividir cada tarea de parseo y
+            {"event": "batch", "batch", "ids_by_file"} al subir cada lote (en orden de lote).
+        cancel_event (threading.Event): Si se activa, la ingesta se detiene tras los lotes en curso.
+        batch_tokens (int): Presupuesto de tokens por lote de embedding (por defecto INGEST_BATCH_TOKENS).
+
+    Returns:
+        bool: True si se completó, False si hubo errores o se canceló, None si no había documentos válidos.
+    """
     try:
         if not os.path.exists("docs"):
             os.makedirs("docs")
@@ -45,118 +814,157 @@ def ingest_docs(uploaded_files: List[UploadedFile], assistant_id: str, index_nam
         if not os.path.exists(index_dir):
             os.makedirs(index_dir)
             logger.info(f"Carpeta '{index_dir}' creada")
-        # Inicializar cliente de Pinecone
-        pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
+        backend = get_vector_backend()
 
         # Comprobar si el índice existe
-        existing_indexes = [idx.name for idx in pc.list_indexes()]
+        existing_indexes = [idx["name"] for idx in backend.list_indexes()]
         index_exists = index_name in existing_indexes
 
         if not index_exists:
             # Crear el índice si no existe
             logger.info(f"Creando nuevo índice: {index_name}")
-            pc.create_index(
-                name=index_name,
-                dimension=1536,  # Dimensión para text-embedding-3-small
-                metric="cosine",
-                spec={
-                    # "replicas": 1,
-                    # "shard_size": 1000,
-                    "serverless": {
-                        "cloud": "aws",
-                        "region": "us-east-1"  # o la región que prefieras
-                    }
+            backend.create_index(index_name, dimension=EMBEDDING_DIMENSION, metric="cosine")
+            invalidate_index_cache(index_name)
+
+        lexical = get_lexical_index(index_name)
+
+        batch_size = batch_size or INGEST_BATCH_SIZE
+        batch_tokens = batch_tokens or INGEST_BATCH_TOKENS
+        max_workers = max_workers or INGEST_MAX_WORKERS
+        window = max(window or INGEST_WINDOW, max_workers)
+        parse_workers = parse_workers or INGEST_PARSE_WORKERS
+
+        # Para subidas pequeñas el arranque del pool cuesta más de lo que ahorra
+        upload_bytes = sum(uploaded_file.size for uploaded_file in uploaded_files)
+        if len(uploaded_files) < 2 and upload_bytes < INGEST_PARSE_POOL_MIN_BYTES:
+            parse_workers = 1
+
+        files_info = {}
+        # Por archivo: IDs previos (manifiesto), IDs de la versión nueva, IDs ya subidos
+        # y IDs omitidos por estar ya en el índice (`skip_ids`)
+        previous_ids = {}
+        new_ids = {}
+        upserted_ids = {}
+        skipped_ids = {}
+        skip_ids = set(skip_ids or ())
+        batches_done = 0
+        known_files = manifest.load_manifest(index_name)["files"]
+        # Carpeta temporal para las subidas que solo están en memoria
+        spool_dir = None
+
+        def plan_tasks():
+            nonlocal spool_dir
+            # Registrar cada archivo subido y repartirlo en tareas de parseo
+            for uploaded_file in uploaded_files:
+                filename = uploaded_file.name
+                path = getattr(uploaded_file, "path", None)
+                if path is None:
+                    spool_dir = spool_dir or tempfile.mkdtemp(prefix="ingest-")
+                    path = _spool_upload(uploaded_file, spool_dir)
+                files_info[filename] = {
+                    "size": os.path.getsize(path),
+                    "hash": file_sha256(path),
+                    "filetype": uploaded_file.type
                 }
-            )
-
-        all_documents = []
-
-        # Procesar cada archivo subido
-        for uploaded_file in uploaded_files:
-            # Crear un archivo temporal para guardarlo
-            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(uploaded_file.name)[1]) as temp_file:
-                temp_file.write(uploaded_file.getvalue())
-                temp_path = temp_file.name
-
-            # Seleccionar el loader apropiado según el tipo de archivo
-            try:
-                if uploaded_file.name.endswith('.pdf'):
-                    loader = PyMuPDFLoader(temp_path)
-                elif uploaded_file.name.endswith('.docx'):
-                    loader = TextLoader(temp_path, encoding="utf-8")
-                elif uploaded_file.name.endswith('.md'):
-                    loader = UnstructuredMarkdownLoader(temp_path)
-                elif uploaded_file.name.endswith('.txt'):
-                    loader = TextLoader(temp_path, encoding="utf-8")
-                elif uploaded_file.name.endswith('.html'):
-                    loader = TextLoader(temp_path, encoding="utf-8")
-                else:
-                    logger.warning(f"Tipo de archivo no soportado: {uploaded_file.name}")
-                    continue
-
-                # Cargar documentos del archivo
-                file_documents = loader.load()
-                logger.info(f"Cargados {len(file_documents)} documentos de {uploaded_file.name}")
-
-                # Añadir metadatos del archivo original
-                for doc in file_documents:
-                    doc.metadata.update({
-                        "filename": uploaded_file.name,
-                        "filetype": uploaded_file.type,
+                previous_ids[filename] = manifest.load_chunk_ids(index_name, filename)
+                new_ids[filename] = []
+                upserted_ids[filename] = []
+                skipped_ids[filename] = []
+
+                # Archivos sin manifiesto: no se puede reingerir por chunks, se eliminan por filtro
+                if delete_existing_files and filename not in known_files:
+                    _delete_file_vectors(index_name, [filename])
+                    logger.info(f"Eliminados documentos anteriores para el archivo: {filename}")
+
+                yield from _plan_parse_tasks(filename, os.path.join(index_dir, filename), path)
+
+        def iter_chunks():
+            # Consumir los chunks parseados en el orden de archivos y páginas
+            for (filename, _, _, page_range), chunks in _iter_parsed_chunks(plan_tasks(), parse_workers):
+                pages = f" (páginas {page_range[0] + 1}-{page_range[1]})" if page_range else ""
+                logger.info(f"Dividido {filename}{pages} en {len(chunks)} chunks")
+                if progress:
+                    progress({"event": "parsed", "filename": filename, "chunks": len(chunks), "pages": page_range})
+                unchanged = set(previous_ids[filename]) if delete_existing_files else set()
+                for chunk in chunks:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise RuntimeError("Ingesta cancelada")
+                    # Añadir metadatos del archivo original
+                    chunk.metadata.update({
+                        "filename": filename,
+                        "filetype": files_info[filename]["filetype"],
                         "assistant_id": assistant_id
                     })
+                    doc_id = chunk_id(chunk)
+                    new_ids[filename].append(doc_id)
+                    # Los chunks que ya están en el índice con el mismo contenido no se vuelven a subir
+                    if doc_id in skip_ids:
+                        skipped_ids[filename].append(doc_id)
+                    elif doc_id not in unchanged:
+                        yield chunk
+
+        def on_batch_done(batch, ids):
+            nonlocal batches_done
+            ids_by_file = {}
+            for doc, doc_id in zip(batch, ids):
+                upserted_ids[doc.metadata["filename"]].append(doc_id)
+                ids_by_file.setdefault(doc.metadata["filename"], []).append(doc_id)
+            lexical.add(ids, [doc.page_content for doc in batch], [doc.metadata["filename"] for doc in batch])
+            batches_done += 1
+            if progress:
+                progress({"event": "batch", "batch": batches_done, "ids_by_file": ids_by_file})
+
+        cache_stats = embeddings.stats()
+        completed = False
 
-                all_documents.extend(file_documents)
-
-            finally:
-                # Asegurar la eliminación del archivo temporal
-                os.unlink(temp_path)
+        try:
+            with metrics.span("ingest") as ingest_span:
+                total_upserted = _run_ingest_pipeline(index_name, iter_chunks(), batch_size, batch_tokens,
+                                                      max_workers, window, on_batch_done)
+                ingest_span.set(chunks=total_upserted)
+            completed = True
+        finally:
+            if spool_dir:
+                shutil.rmtree(spool_dir, ignore_errors=True)
+            # Registrar en el manifiesto lo que haya en el índice, incluso si hubo un error
+            recorded = {}
+            for filename, info in files_info.items():
+                previous = previous_ids[filename]
+                if completed and delete_existing_files:
+                    # Eliminar por ID los chunks que ya no existen en la nueva versión
+                    vanished = list(set(previous) - set(new_ids[filename]))
+                    if vanished:
+                        backend.delete(index_name, ids=vanished)
+                        lexical.remove(vanished)
+                    logger.info(
+                        f"{filename}: {len(new_ids[filename]) - len(upserted_ids[filename])} chunks sin cambios, "
+                        f"{len(upserted_ids[filename])} nuevos o modificados, {len(vanished)} eliminados"
+                    )
+                    ids = new_ids[filename]
+                else:
+                    ids = list(dict.fromkeys(previous + skipped_ids[filename] + upserted_ids[filename]))
+
+                if ids:
+                    # El hash solo se registra si el archivo se ha subido completo (así una
+                    # ingesta interrumpida no se confunde después con un archivo sin cambios)
+                    recorded[filename] = {
+                        "chunk_ids": ids,
+                        "size": info["size"],
+                        "hash": info["hash"] if completed else known_files.get(filename, {}).get("hash"),
+                        "filetype": info["filetype"]
+                    }
+            manifest.record_files(index_name, recorded)
+            lexical.save()
+            invalidate_answers(index_name)
+            invalidate_index_cache(index_name)
 
         # Salir si no hay documentos
-        if not all_documents:
+        if not any(new_ids.values()):
             logger.warning("No se pudieron cargar documentos válidos")
             return
 
-        # Dividir en chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=50,
-        )
-        documents = text_splitter.split_documents(all_documents)
-        logger.info(f"Dividido en {len(documents)} chunks")
-
-        # Definir tamaño del lote
-        batch_size = 100
-        total_batches = (len(documents) + batch_size - 1) // batch_size
-
-        # Inicializar vectorstore con el índice existente
-        vectorstore = PineconeVectorStore(index_name=index_name, embedding=embeddings)
-
-        # Si se indica que se deben eliminar archivos existentes
-        if delete_existing_files:
-            # Obtener nombres de archivos a insertar
-            filenames = [doc.metadata["filename"] for doc in all_documents if "filename" in doc.metadata]
-            filenames = list(set(filenames))  # Eliminar duplicados
-
-            if filenames:
-                # Eliminar vectores con estos nombres de archivo
-                vectorstore.delete(
-                    filter={"filename": {"$in": filenames}}
-                )
-                logger.info(f"Eliminados documentos anteriores para los archivos: {', '.join(filenames)}")
-
-        logger.info(f'Agregando {len(documents)} documentos a Pinecone en {total_batches} lotes')
-
-        # Procesar por lotes
-        for i in range(0, len(documents), batch_size):
-            batch = documents[i:i+batch_size]
-            end_idx = min(i+batch_size, len(documents))
-            logger.info(f"Procesando lote {i//batch_size + 1}/{total_batches} (documentos {i+1}-{end_idx})")
-
-            # Añadir documentos al índice existente
-            vectorstore.add_documents(batch)
-
-        logger.info("****Carga en el índice vectorial completada****")
+        _log_embedding_cache_stats(cache_stats)
+        logger.info(f"****Carga en el índice vectorial completada ({total_upserted} chunks subidos)****")
         return True
 
     except Exception as e:
@@ -164,9 +972,23 @@ def ingest_docs(uploaded_files: List[UploadedFile], assistant_id: str, index_nam
         return False
 
 
-def get_all_indexes(detailed=False):
+async def aingest_docs(uploaded_files: List[UploadedFile], assistant_id: str, index_name, delete_existing_files=False,
+                       **kwargs):
+    """
+    Variante asíncrona de `ingest_docs` (mismos argumentos y resultado).
+
+    El parseo es trabajo de CPU en un pool de procesos, así que la ingesta se
+    ejecuta en un hilo; sus embeddings y subidas ya van por los clientes
+    asíncronos y el limitador compartido (ver `_run_ingest_pipeline`).
+    """
+    return await asyncio.to_thread(ingest_docs, uploaded_files, assistant_id, index_name, delete_existing_files,
+                                   **kwargs)
+
+
+async def aget_all_indexes(detailed=False):
     """
-    Obtiene todos los índices disponibles en la cuenta de Pinecone.
+    Obtiene todos los índices disponibles en el backend de vectores. El listado
+    se reutiliza durante INDEX_CACHE_TTL segundos (ver `invalidate_index_cache`).
 
     Args:
         detailed (bool): Si es True, devuelve información detallada sobre cada índice.
@@ -176,33 +998,62 @@ def get_all_indexes(detailed=False):
         list: Lista de nombres de índices o lista de diccionarios con información detallada.
     """
     try:
-        pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
-        indexes = pc.list_indexes()
+        indexes = _cached_index_info("indexes")
+        if indexes is None:
+            async with _get_async_limiter():
+                indexes = await get_vector_backend().alist_indexes()
+            _cache_index_info("indexes", indexes)
 
         if not detailed:
             # Solo devolver los nombres de los índices
-            return [idx.name for idx in indexes]
+            return [idx["name"] for idx in indexes]
         else:
-            # Devolver información detallada sobre cada índice
-            detailed_info = []
-            for idx in indexes:
-                # Obtener propiedades disponibles del objeto índice
-                index_info = {
-                    "name": idx.name,
-                    "host": getattr(idx, "host", "N/A"),
-                    "dimension": getattr(idx, "dimension", "N/A"),
-                    "metric": getattr(idx, "metric", "N/A"),
-                    "status": getattr(idx, "status", "N/A")
-                }
-                detailed_info.append(index_info)
-            return detailed_info
+            # Devolver información detallada sobre cada índice (copias: el listado está cacheado)
+            return [dict(idx) for idx in indexes]
     except Exception as e:
         logger.error(f"Error al obtener índices: {e}")
         return []
 
-def get_docs_by_index(index_name: str, limit: int = 10):
+
+def get_all_indexes(detailed=False):
+    """
+    Variante síncrona de `aget_all_indexes`.
+    """
+    return _run_sync(aget_all_indexes(detailed))
+
+
+async def aget_index_stats(index_name: str) -> dict:
+    """
+    Obtiene las estadísticas de un índice, reutilizadas durante INDEX_CACHE_TTL segundos.
+
+    Args:
+        index_name (str): Nombre del índice.
+
+    Returns:
+        dict: {"vector_count", "dimension", "namespaces": {namespace: vectores}}, o {} si hubo un error.
+    """
+    try:
+        stats = _cached_index_info(("stats", index_name))
+        if stats is None:
+            async with _get_async_limiter():
+                stats = await get_vector_backend().adescribe_index_stats(index_name)
+            _cache_index_info(("stats", index_name), stats)
+        return stats
+    except Exception as e:
+        logger.error(f"Error al obtener las estadísticas del índice {index_name}: {e}")
+        return {}
+
+
+def get_index_stats(index_name: str) -> dict:
+    """
+    Variante síncrona de `aget_index_stats`.
+    """
+    return _run_sync(aget_index_stats(index_name))
+
+
+async def aget_docs_by_index(index_name: str, limit: int = 10):
     """
-    Obtiene documentos de un índice específico en Pinecone.
+    Obtiene documentos de un índice específico.
 
     Args:
         index_name (str): Nombre del índice del cual obtener los documentos.
@@ -212,17 +1063,133 @@ def get_docs_by_index(index_name: str, limit: int = 10):
         list: Lista de documentos recuperados del índice.
     """
     try:
-        pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
-        vectorstore = PineconeVectorStore(index_name=index_name, embedding=embeddings)
-        docs = vectorstore.similarity_search("", k=limit)
-        return docs
+        async with _get_async_limiter():
+            query_vector = await embeddings.aembed_query("")
+        return await _asimilarity_search(index_name, query_vector, k=limit)
     except Exception as e:
         logger.error(f"Error al obtener documentos del índice {index_name}: {e}")
         return []
 
+
+def get_docs_by_index(index_name: str, limit: int = 10):
+    """
+    Variante síncrona de `aget_docs_by_index`.
+    """
+    return _run_sync(aget_docs_by_index(index_name, limit))
+
+
+async def _adelete_file_vectors(index_name: str, filenames: List[str]):
+    """
+    Elimina los vectores de los archivos indicados, por ID si constan en el
+    manifiesto y por filtro de metadatos en caso contrario.
+    """
+    files = manifest.load_manifest(index_name)["files"]
+    ids = [doc_id for filename in filenames if filename in files
+           for doc_id in manifest.load_chunk_ids(index_name, filename)]
+    unknown = [filename for filename in filenames if filename not in files]
+
+    backend = get_vector_backend()
+    deletes = []
+    if ids:
+        deletes.append(backend.adelete(index_name, ids=ids))
+    if unknown:
+        deletes.append(backend.adelete(index_name, filter={"filename": {"$in": unknown}}))
+    async with _get_async_limiter():
+        await asyncio.gather(*deletes)
+
+    # Cargar el índice léxico puede requerir reconstruirlo desde el backend
+    lexical = await asyncio.to_thread(get_lexical_index, index_name)
+    for filename in filenames:
+        lexical.remove_file(filename)
+    await asyncio.to_thread(lexical.save)
+
+
+def _delete_file_vectors(index_name: str, filenames: List[str]):
+    _run_sync(_adelete_file_vectors(index_name, filenames))
+
+
+def _rebuild_manifest(index_name: str):
+    """
+    Reconstruye el manifiesto de un índice creado antes de que existiera,
+    enumerando todos los IDs del índice y leyendo sus metadatos.
+    """
+    logger.info(f"Reconstruyendo manifiesto del índice {index_name}")
+    backend = get_vector_backend()
+
+    ids_by_file = {}
+    types_by_file = {}
+    for ids in backend.list_ids(index_name):
+        for doc_id, vector in backend.fetch(index_name, ids).items():
+            metadata = vector["metadata"]
+            filename = metadata.get("filename")
+            if filename:
+                ids_by_file.setdefault(filename, []).append(doc_id)
+                types_by_file[filename] = metadata.get("filetype")
+
+    entries = {}
+    for filename, ids in ids_by_file.items():
+        size = content_hash = None
+        local_path = os.path.join("docs", index_name, filename)
+        if os.path.exists(local_path):
+            with open(local_path, "rb") as f:
+                file_bytes = f.read()
+            size = len(file_bytes)
+            content_hash = hashlib.sha256(file_bytes).hexdigest()
+        entries[filename] = {
+            "chunk_ids": ids,
+            "size": size,
+            "hash": content_hash,
+            "filetype": types_by_file.get(filename)
+        }
+    if entries:
+        manifest.record_files(index_name, entries)
+    else:
+        manifest.save_manifest(index_name, {"files": {}})
+    return manifest.load_manifest(index_name)
+
+
+def _rebuild_lexical_index(index_name: str) -> LexicalIndex:
+    """
+    Construye el índice BM25 de un asistente leyendo todos los chunks del backend.
+    """
+    logger.info(f"Construyendo índice léxico del índice {index_name}")
+    backend = get_vector_backend()
+    lexical = LexicalIndex(index_name)
+    if index_name in [idx["name"] for idx in backend.list_indexes()]:
+        for ids in backend.list_ids(index_name):
+            vectors = backend.fetch(index_name, ids)
+            lexical.add(
+                list(vectors),
+                [vector["metadata"].get(TEXT_KEY, "") for vector in vectors.values()],
+                [vector["metadata"].get("filename") for vector in vectors.values()]
+            )
+    lexical.save()
+    return lexical
+
+
+def get_index_files(index_name: str):
+    """
+    Obtiene los archivos de un índice a partir de su manifiesto, sin consultar
+    el vector store.
+
+    Args:
+        index_name (str): Nombre del índice.
+
+    Returns:
+        dict: {filename: {"chunk_count", "size", "hash", "filetype", "ingested_at"}}
+    """
+    try:
+        if not manifest.manifest_exists(index_name):
+            return _rebuild_manifest(index_name)["files"]
+        return manifest.load_manifest(index_name)["files"]
+    except Exception as e:
+        logger.error(f"Error al leer el manifiesto del índice {index_name}: {e}")
+        return {}
+
+
 def get_chunked_docs_by_index(index_name: str, limit: int = 10):
     """
-    Obtiene documentos fragmentados de un índice específico en Pinecone.
+    Obtiene documentos fragmentados de un índice específico.
 
     Args:
         index_name (str): Nombre del índice del cual obtener los documentos.
@@ -232,9 +1199,7 @@ def get_chunked_docs_by_index(index_name: str, limit: int = 10):
         list: Lista de documentos fragmentados recuperados del índice.
     """
     try:
-        pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
-        vectorstore = PineconeVectorStore(index_name=index_name, embedding=embeddings)
-        docs = vectorstore.similarity_search("", k=limit)
+        docs = _similarity_search(index_name, embeddings.embed_query(""), k=limit)
         return [doc.page_content for doc in docs]
     except Exception as e:
         logger.error(f"Error al obtener documentos fragmentados del índice {index_name}: {e}")
@@ -243,10 +1208,11 @@ def get_chunked_docs_by_index(index_name: str, limit: int = 10):
 
 def delete_index(index_name: str):
     try:
-        # Eliminar índice de Pinecone
-        pc = Pinecone(api_key=os.environ.get("PINECONE_API_KEY"))
-        if index_name in [idx.name for idx in pc.list_indexes()]:
-            pc.delete_index(index_name)
+        # Eliminar índice del backend de vectores
+        backend = get_vector_backend()
+        if index_name in [idx["name"] for idx in backend.list_indexes()]:
+            backend.delete_index(index_name)
+            invalidate_index(index_name)
             logger.info(f"Índice {index_name} eliminado correctamente.")
 
             # Eliminar carpeta física docs/nombre-indice
@@ -277,58 +1243,391 @@ def delete_index(index_name: str):
         return False
 
 
-def run_llm_on_index(query: str, chat_history: list, index_name: str):
+def _match_to_document(match: dict) -> Document:
+    """
+    Convierte un resultado del backend en un Document (el texto sale de TEXT_KEY).
+    """
+    metadata = dict(match["metadata"])
+    content = metadata.pop(TEXT_KEY, "")
+    return Document(id=match["id"], page_content=content, metadata=metadata)
+
+
+def _similarity_search(index_name: str, query_vector, k: int, filter: dict = None) -> List[Document]:
+    matches = get_vector_backend().query(index_name, query_vector, k, filter=filter)
+    return [_match_to_document(match) for match in matches]
+
+
+async def _asimilarity_search(index_name: str, query_vector, k: int, filter: dict = None) -> List[Document]:
+    async with _get_async_limiter():
+        matches = await get_vector_backend().aquery(index_name, query_vector, k, filter=filter)
+    return [_match_to_document(match) for match in matches]
+
+
+async def _asearch(index_name: str, question: str, config: dict):
+    """
+    Recupera el contexto para la pregunta (ver `_aretrieve`) midiendo la etapa `retrieve`.
+    """
+    with metrics.span("retrieve") as retrieve_span:
+        query_vector, docs = await _aretrieve(index_name, question, config)
+        retrieve_span.set(chunks=len(docs))
+    return query_vector, docs
+
+
+async def _aretrieve(index_name: str, question: str, config: dict):
+    """
+    Recupera los `retrieval_k` fragmentos más relevantes para la pregunta.
+
+    1. Candidatos: los `fetch_k` mejores de la búsqueda densa y, con
+       `hybrid_search`, de la BM25 local (en paralelo), fusionados con
+       Reciprocal Rank Fusion. Los que solo encontró BM25 se leen por ID.
+    2. Con `rerank`, la relevancia de cada candidato combina la similitud
+       coseno y la cobertura de los términos de la pregunta.
+    3. Con `mmr`, se eligen los `retrieval_k` candidatos con Maximal Marginal
+       Relevance (`mmr_lambda`) para no pasar al modelo fragmentos casi
+       duplicados; si no, los `retrieval_k` más relevantes.
+
+    Returns:
+        tuple: (embedding de la pregunta, documentos recuperados)
+    """
+    k = config["retrieval_k"]
+    fetch_k = max(config["fetch_k"], k)
+    needs_vectors = config["mmr"] or config["rerank"]
+    backend = get_vector_backend()
+    limiter = _get_async_limiter()
+
+    lexical_search = None
+    if config["hybrid_search"]:
+        # La búsqueda léxica es local: va a un hilo y comparte la traza de la consulta (ver `metrics.trace`)
+        lexical_search = asyncio.create_task(asyncio.to_thread(_lexical_search, index_name, question, fetch_k))
+    try:
+        async with limiter:
+            with metrics.span("embed_query", tokens=count_tokens(question)):
+                query_vector = await embeddings.aembed_query(question)
+
+        # Sin fusión ni etapa posterior bastan los k primeros resultados densos
+        dense_k = fetch_k if lexical_search is not None or needs_vectors else k
+        async with limiter:
+            with metrics.span("vector_query") as query_span:
+                matches = {
+                    match["id"]: match
+                    for match in await backend.aquery(index_name, query_vector, dense_k, include_values=needs_vectors)
+                }
+                query_span.set(chunks=len(matches))
+    except BaseException:
+        if lexical_search is not None:
+            lexical_search.cancel()
+        raise
+
+    ranked = [(doc_id, match["score"]) for doc_id, match in matches.items()]
+    if lexical_search is not None:
+        lexical_ids = [doc_id for doc_id, _ in await lexical_search]
+        ranked = reciprocal_rank_fusion([list(matches), lexical_ids])
+    ranked = ranked[:fetch_k if needs_vectors else k]
+
+    missing = [doc_id for doc_id, _ in ranked if doc_id not in matches]
+    if missing:
+        async with limiter:
+            fetched = await backend.afetch(index_name, missing)
+        matches.update({doc_id: {"id": doc_id, **vector} for doc_id, vector in fetched.items()})
+    ranked = [(doc_id, score) for doc_id, score in ranked if doc_id in matches]
+    candidates = [matches[doc_id] for doc_id, _ in ranked]
+
+    if needs_vectors and candidates:
+        with metrics.span("rerank", chunks=len(candidates)):
+            candidates = _rerank_candidates(question, query_vector, candidates, ranked, k, config,
+                                            hybrid=lexical_search is not None)
+
+    return query_vector, [_match_to_document(candidate) for candidate in candidates[:k]]
+
+
+def _lexical_search(index_name: str, question: str, k: int) -> list:
+    with metrics.span("lexical_search") as lexical_span:
+        results = get_lexical_index(index_name).search(question, k)
+        lexical_span.set(chunks=len(results))
+    return results
+
+
+def _rerank_candidates(question: str, query_vector, candidates: list, ranked: list, k: int, config: dict,
+                       hybrid: bool) -> list:
+    """
+    Reordena (`rerank`) y diversifica (`mmr`) los candidatos y devuelve los `k` elegidos.
+    """
+    vectors = np.array([candidate["values"] for candidate in candidates], dtype=np.float32)
+    if config["rerank"]:
+        texts = [candidate["metadata"].get(TEXT_KEY, "") for candidate in candidates]
+        relevance = rerank.rerank_scores(question, query_vector, vectors, texts)
+    elif hybrid:
+        # Puntuación RRF reescalada a [0, 1] para compararla con la similitud coseno
+        relevance = np.array([score for _, score in ranked], dtype=np.float32)
+        relevance /= relevance.max()
+    else:
+        relevance = rerank.cosine_scores(query_vector, vectors)
+
+    if config["mmr"]:
+        order = rerank.mmr(query_vector, vectors, k, config["mmr_lambda"], relevance)
+    else:
+        order = np.argsort(-relevance)[:k]
+    return [candidates[i] for i in order]
+
+
+async def _arephrase(chains: dict, rephrase_input: dict) -> str:
+    async with _get_async_limiter():
+        with metrics.span("rephrase") as rephrase_span:
+            question = await chains["rephrase"].ainvoke(rephrase_input)
+            rephrase_span.set(tokens=count_tokens(question))
+    return question
+
+
+async def _aretrieve_context(index_name: str, query: str, chat_history: list, chains: dict, config: dict):
+    """
+    Reformula la pregunta con el historial solo cuando puede servir, y recupera el contexto.
+
+    - Sin historial, o si la heurística local ve la pregunta autocontenida, se
+      recupera directamente con la pregunta original.
+    - Si hay anáforas ("explícamelo", "¿y eso?"), se reformula y luego se recupera.
+    - En caso de duda, la reformulación y la recuperación con la pregunta original
+      se lanzan en paralelo; si la reformulación resulta equivalente se usa esa
+      recuperación y, si no, se recupera de nuevo con la pregunta reformulada.
+
+    Returns:
+        tuple: (pregunta independiente, embedding de la pregunta, documentos recuperados)
+    """
+    path = query_rewrite.classify(query, chat_history)
+
+    if path in (query_rewrite.NO_HISTORY, query_rewrite.DIRECT):
+        query_rewrite.record(path)
+        return (query, *await _asearch(index_name, query, config))
+
+    rephrase_input = {"input": query, "chat_history": chat_history}
+    if path == query_rewrite.REPHRASE:
+        query_rewrite.record(path)
+        question = await _arephrase(chains, rephrase_input)
+        return (question, *await _asearch(index_name, question, config))
+
+    # Especulativo: reformular y recuperar con la pregunta original a la vez
+    raw_search = asyncio.create_task(_asearch(index_name, query, config))
+    try:
+        question = await _arephrase(chains, rephrase_input)
+    except BaseException:
+        raw_search.cancel()
+        raise
+    if query_rewrite.lexical_similarity(question, query) >= query_rewrite.EQUIVALENT_SIMILARITY:
+        query_rewrite.record("speculative_raw")
+        return (query, *await raw_search)
+
+    raw_search.cancel()
+    query_rewrite.record("speculative_rephrased")
+    return (question, *await _asearch(index_name, question, config))
+
+
+def summarize_history(summary: str, messages: list) -> str:
+    """
+    Pliega `messages` en el resumen del historial con el modelo de chat.
+    """
+    new_lines = "\n".join(f"{role}: {content}" for role, content in messages)
+    chain = SUMMARY_PROMPT | get_chat_model() | StrOutputParser()
+    return chain.invoke({"summary": summary, "new_lines": new_lines})
+
+
+def new_chat_history(**kwargs) -> ChatHistory:
+    """
+    Crea un historial de chat con presupuesto de tokens y resumen progresivo.
+    """
+    return ChatHistory(summarize=summarize_history, **kwargs)
+
+
+def _history_messages(chat_history) -> list:
+    """
+    Acepta un ChatHistory o la lista de tuplas (rol, texto) y devuelve la lista para los prompts.
+    """
+    if hasattr(chat_history, "to_messages"):
+        return chat_history.to_messages()
+    return list(chat_history or [])
+
+
+async def arun_llm_on_index(query: str, chat_history, index_name: str,
+                            model: str = CHAT_MODEL, temperature: float = 0):
     """
     Ejecuta el modelo de lenguaje utilizando el índice especificado para responder consultas.
     """
+    async for event in astream_llm_on_index(query, chat_history, index_name, model=model, temperature=temperature):
+        if event["type"] == "done":
+            return {key: value for key, value in event.items() if key != "type"}
+
+
+def run_llm_on_index(query: str, chat_history, index_name: str,
+                     model: str = CHAT_MODEL, temperature: float = 0):
+    """
+    Variante síncrona de `arun_llm_on_index`.
+    """
+    return _run_sync(arun_llm_on_index(query, chat_history, index_name, model=model, temperature=temperature))
+
+
+async def arun_llm_batch(questions: list, index_name: str, max_concurrency: int = None,
+                         model: str = CHAT_MODEL, temperature: float = 0) -> list:
+    """
+    Responde un lote de preguntas sobre un mismo índice de forma concurrente.
+
+    Todas las preguntas comparten las cadenas RAG, los clientes y las cachés del
+    índice; la recuperación y la generación de hasta `max_concurrency`
+    preguntas se solapan (y sus llamadas de red pasan por el limitador compartido).
+
+    Args:
+        questions (list): Preguntas, como texto o como dict {"query", "chat_history"} (historial opcional).
+        index_name (str): Nombre del índice.
+        max_concurrency (int): Preguntas en curso a la vez (por defecto BATCH_QA_CONCURRENCY).
+        model (str): Modelo de chat.
+        temperature (float): Temperatura del modelo.
+
+    Returns:
+        list: Un resultado por pregunta y en el mismo orden (ver `run_llm_on_index`). Las
+              preguntas que fallan llevan el mensaje en "error" en lugar de interrumpir el lote.
+    """
+    items = [{"query": question} if isinstance(question, str) else question for question in questions]
+    start = time.perf_counter()
+
+    # Construir las cadenas una sola vez, antes de repartir las preguntas
+    get_rag_chains(index_name, model=model, temperature=temperature)
+
+    in_flight = asyncio.Semaphore(max_concurrency or BATCH_QA_CONCURRENCY)
+
+    async def answer(item):
+        async with in_flight:
+            try:
+                return await arun_llm_on_index(item["query"], item.get("chat_history") or [], index_name,
+                                               model=model, temperature=temperature)
+            except Exception as e:
+                return {"query": item["query"], "result": None, "source_documents": [], "error": str(e)}
+
+    results = list(await asyncio.gather(*(answer(item) for item in items)))
+
+    errors = sum(1 for result in results if result.get("error"))
+    logger.info(
+        f"Lote de {len(items)} preguntas en {index_name}: {errors} con error, "
+        f"{time.perf_counter() - start:.2f}s"
+    )
+    return results
+
+
+def run_llm_batch(questions: list, index_name: str, max_concurrency: int = None,
+                  model: str = CHAT_MODEL, temperature: float = 0) -> list:
+    """
+    Variante síncrona de `arun_llm_batch`.
+    """
+    return _run_sync(arun_llm_batch(questions, index_name, max_concurrency=max_concurrency,
+                                    model=model, temperature=temperature))
+
+
+async def astream_llm_on_index(query: str, chat_history, index_name: str,
+                               model: str = CHAT_MODEL, temperature: float = 0):
+    """
+    Variante en streaming de `arun_llm_on_index`.
+
+    Genera eventos a medida que avanza la cadena:
+        {"type": "sources", "source_documents": [...]} en cuanto termina la recuperación,
+        {"type": "token", "content": str} por cada fragmento de la respuesta,
+        {"type": "done", "query", "result", "source_documents", "timings", "cached", "context_tokens", "spans",
+         "error"} al final.
+
+    `timings` contiene `retrieval`, `ttft` (tiempo hasta el primer token) y `total`, en segundos.
+    `context_tokens` son los tokens de los fragmentos pasados al modelo y `spans`
+    el desglose por etapas (rephrase, embed_query, vector_query, retrieve,
+    generate...) como dicts {"name", "seconds", "tokens", "chunks"} (ver `metrics`).
+    Si el asistente tiene activada la caché semántica y la pregunta coincide con
+    una anterior con el mismo contexto, la respuesta sale de la caché (`cached`).
+
+    Si la consulta falla, `error` contiene el mensaje (y `result` el texto que se
+    muestra al usuario); si no, es None.
+
+    `chat_history` puede ser un ChatHistory (ver `new_chat_history`) o una lista
+    de tuplas (rol, texto).
+    """
+    start = time.perf_counter()
+    timings = {"retrieval": None, "ttft": None, "total": None}
+    answer_parts = []
+    source_documents = []
+    context_tokens = 0
+    cached = False
+    spans = []
+    error = None
+
     try:
-        # Conexión al índice específico
-        vectorstore = PineconeVectorStore(
-            index_name=index_name,
-            embedding=embeddings
-        )
-
-        # Configurar el LLM
-        chat = ChatOpenAI(
-            verbose=True,
-            temperature=0,
-            model='gpt-4o-mini'
-        )
-
-        # Usar prompts y cadenas de LangChain
-        retrieval_qa_chat_prompt = hub.pull("langchain-ai/retrieval-qa-chat")
-        stuff_documents_chain = create_stuff_documents_chain(chat, retrieval_qa_chat_prompt)
-
-        # Crear un retriever consciente del historial
-        rephrase_prompt = hub.pull("langchain-ai/chat-langchain-rephrase")
-        history_aware_retriever = create_history_aware_retriever(
-            llm=chat,
-            retriever=vectorstore.as_retriever(),
-            prompt=rephrase_prompt
-        )
-
-        # Crear la cadena de recuperación
-        qa = create_retrieval_chain(
-            retriever=history_aware_retriever,
-            combine_docs_chain=stuff_documents_chain
-        )
-
-        # Ejecutar la consulta
-        result = qa.invoke({"input": query, "chat_history": chat_history})
-
-        # Formatear el resultado
-        return {
-            "query": result['input'],
-            "result": result['answer'],
-            "source_documents": result['context']
+        chains = get_rag_chains(index_name, model=model, temperature=temperature)
+        config = assistant_config.get_config(index_name)
+        chat_history = _history_messages(chat_history)
+
+        with metrics.trace() as spans:
+            question, query_vector, source_documents = await _aretrieve_context(index_name, query, chat_history,
+                                                                                chains, config)
+        timings["retrieval"] = time.perf_counter() - start
+        context_tokens = sum(count_tokens(doc.page_content) for doc in source_documents)
+        yield {"type": "sources", "source_documents": source_documents}
+
+        cache = get_semantic_cache(index_name, config) if config["semantic_cache"] else None
+        context_key = tuple(sorted(doc.id for doc in source_documents))
+        hit = cache.lookup(query_vector, context_key) if cache else None
+
+        generate_start = time.perf_counter()
+        if hit:
+            cached = True
+            timings["ttft"] = time.perf_counter() - start
+            answer_parts.append(hit["result"])
+            yield {"type": "token", "content": hit["result"]}
+        else:
+            async with _get_async_limiter():
+                async for token in chains["answer"].astream(
+                    {"input": query, "chat_history": chat_history, "context": source_documents}
+                ):
+                    if not token:
+                        continue
+                    if timings["ttft"] is None:
+                        timings["ttft"] = time.perf_counter() - start
+                    answer_parts.append(token)
+                    yield {"type": "token", "content": token}
+
+        result = "".join(answer_parts)
+        generate = {
+            "name": "generate",
+            "seconds": time.perf_counter() - generate_start,
+            "tokens": count_tokens(result),
+            "context_tokens": context_tokens,
+            "cached": cached
         }
+        metrics.record(**generate)
+        spans.append(generate)
+        if cache and not cached:
+            cache.store(query_vector, context_key, result, source_documents)
     except Exception as e:
         logger.error(f"Error al ejecutar consulta en índice {index_name}: {e}")
-        return {
-            "query": query,
-            "result": f"Error al procesar la consulta: {str(e)}",
-            "source_documents": []
-        }
+        error = str(e)
+        result = f"Error al procesar la consulta: {error}"
+        yield {"type": "token", "content": result}
+
+    timings["total"] = time.perf_counter() - start
+    logger.info(
+        f"Consulta en {index_name}{' (caché semántica)' if cached else ''}: "
+        f"{len(source_documents)} fragmentos ({context_tokens} tokens de contexto), "
+        f"primer token en {timings['ttft'] or 0:.2f}s, total {timings['total']:.2f}s"
+    )
+    yield {
+        "type": "done",
+        "query": query,
+        "result": result,
+        "source_documents": source_documents,
+        "timings": timings,
+        "cached": cached,
+        "context_tokens": context_tokens,
+        "spans": spans,
+        "error": error
+    }
+
+
+def stream_llm_on_index(query: str, chat_history, index_name: str,
+                        model: str = CHAT_MODEL, temperature: float = 0):
+    """
+    Variante síncrona de `astream_llm_on_index`: genera los mismos eventos a medida que llegan.
+    """
+    yield from _iter_sync(astream_llm_on_index(query, chat_history, index_name, model=model, temperature=temperature))
 
 
 def create_sources_string(source_urls):
@@ -348,43 +1647,97 @@ def create_sources_string(source_urls):
     return sources_string
 
 
-def get_document_content_by_id(index_name, doc_id):
+def _list_file_chunk_ids(index_name: str, filename: str) -> List[str]:
+    """
+    Enumera los IDs de todos los chunks de un archivo: desde el manifiesto o,
+    si no consta en él, listando el índice por el prefijo de ID del archivo.
+    """
+    if filename in manifest.load_manifest(index_name)["files"]:
+        return manifest.load_chunk_ids(index_name, filename)
+
+    backend = get_vector_backend()
+    return [doc_id for ids in backend.list_ids(index_name, prefix=file_id_prefix(filename)) for doc_id in ids]
+
+
+async def afetch_vectors(index_name: str, ids: List[str]) -> dict:
+    """
+    Recupera vectores por ID en páginas de PINECONE_FETCH_BATCH_SIZE pedidas en paralelo.
+
+    Returns:
+        dict: {id: {"values", "metadata"}}
+    """
+    backend = get_vector_backend()
+    limiter = _get_async_limiter()
+    pages = [ids[i:i + PINECONE_FETCH_BATCH_SIZE] for i in range(0, len(ids), PINECONE_FETCH_BATCH_SIZE)]
+
+    async def fetch_page(page):
+        async with limiter:
+            return await backend.afetch(index_name, page)
+
+    vectors = {}
+    for page_vectors in await asyncio.gather(*(fetch_page(page) for page in pages)):
+        vectors.update(page_vectors)
+    return vectors
+
+
+def fetch_vectors(index_name: str, ids: List[str]) -> dict:
+    """
+    Variante síncrona de `afetch_vectors`.
+    """
+    return _run_sync(afetch_vectors(index_name, ids))
+
+
+async def aget_document_content_by_id(index_name, doc_id):
     """
     Obtiene el contenido completo de un documento específico por su ID.
 
+    Los fragmentos se leen por ID (sin búsqueda por similitud ni límite de
+    resultados) y se devuelven ordenados por página y posición.
+
     Args:
         index_name (str): Nombre del índice donde se encuentra el documento.
         doc_id (str): ID del documento o nombre del archivo.
 
     Returns:
-        dict: Información completa del documento, incluyendo contenido y metadatos.
+        list: Fragmentos {"content", "metadata"} en orden del documento, o un
+              dict con "content" y "metadata" si no se encontró o hubo un error.
     """
     try:
-        vectorstore = PineconeVectorStore(
-            index_name=index_name,
-            embedding=embeddings
-        )
-
-        # Buscar fragmentos que coincidan con el archivo
-        docs = vectorstore.similarity_search(
-            "",
-            k=100,  # Obtener suficientes documentos para encontrar todos los fragmentos
-            filter={"filename": doc_id}
-        )
-
-        if not docs:
+        # Sin manifiesto hay que listar el índice (síncrono): en un hilo
+        chunk_ids = await asyncio.to_thread(_list_file_chunk_ids, index_name, doc_id)
+        if not chunk_ids:
+            return {"content": "No se encontró el documento", "metadata": {}}
+
+        vectors = await afetch_vectors(index_name, chunk_ids)
+        if not vectors:
             return {"content": "No se encontró el documento", "metadata": {}}
 
-        # Organizar por fragmentos
-        fragments = [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs]
-        return fragments
+        # Organizar por fragmentos en el orden del documento (página, posición en la página)
+        ordered = []
+        for position, vector_id in enumerate(chunk_ids):
+            if vector_id not in vectors:
+                continue
+            metadata = dict(vectors[vector_id]["metadata"])
+            content = metadata.pop(TEXT_KEY, "")
+            sort_key = (metadata.get("page", metadata.get("section", 0)), metadata.get("chunk_index", 0), position)
+            ordered.append((sort_key, {"content": content, "metadata": metadata}))
+
+        ordered.sort(key=lambda item: item[0])
+        return [fragment for _, fragment in ordered]
 
     except Exception as e:
         logger.error(f"Error al recuperar documento {doc_id} del índice {index_name}: {e}")
         return {"content": f"Error: {str(e)}", "metadata": {}}
 
 
-def delete_document_by_id(index_name, doc_id):
+def get_document_content_by_id(index_name, doc_id):
+    """
+    Variante síncrona de `aget_document_content_by_id`.
+    """
+    return _run_sync(aget_document_content_by_id(index_name, doc_id))
+
+
+async def adelete_document_by_id(index_name, doc_id):
     """
     Elimina un documento específico del índice por su ID.
 
@@ -396,15 +1749,11 @@ def delete_document_by_id(index_name, doc_id):
         bool: True si se eliminó correctamente, False en caso contrario.
     """
     try:
-        vectorstore = PineconeVectorStore(
-            index_name=index_name,
-            embedding=embeddings
-        )
-
         # Eliminar documentos que coincidan con el ID
-        vectorstore.delete(
-            filter={"filename": doc_id}
-        )
+        await _adelete_file_vectors(index_name, [doc_id])
+        manifest.remove_file(index_name, doc_id)
+        invalidate_answers(index_name)
+        invalidate_index_cache(index_name)
         logger.info(f"Documento {doc_id} eliminado del índice {index_name}.")
 
         # Eliminar archivos físicos
@@ -427,6 +1776,13 @@ def delete_document_by_id(index_name, doc_id):
         return False
 
 
+def delete_document_by_id(index_name, doc_id):
+    """
+    Variante síncrona de `adelete_document_by_id`.
+    """
+    return _run_sync(adelete_document_by_id(index_name, doc_id))
+
+
 def add_docs_to_index(index_name: str, documents: List[dict]):
     """
     Añade documentos al índice especificado.
@@ -439,8 +1795,44 @@ def add_docs_to_index(index_name: str, documents: List[dict]):
         bool: True si se añadieron correctamente, False en caso contrario.
     """
     try:
-        vectorstore = PineconeVectorStore(index_name=index_name, embedding=embeddings)
-        vectorstore.add_documents(documents)
+        docs = [
+            doc if isinstance(doc, Document) else Document(page_content=doc["content"], metadata=doc.get("metadata", {}))
+            for doc in documents
+        ]
+        # Los chunks de archivos usan el ID determinista; el resto, el hash de su contenido
+        ids = [
+            chunk_id(doc) if "filename" in doc.metadata
+            else hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest()
+            for doc in docs
+        ]
+        cache_stats = embeddings.stats()
+        _embed_and_upsert_batch(index_name, docs, ids)
+        lexical = get_lexical_index(index_name)
+        lexical.add(ids, [doc.page_content for doc in docs], [doc.metadata.get("filename") for doc in docs])
+        lexical.save()
+
+        # Los chunks de archivos se suman a los que el manifiesto ya tiene registrados
+        known_files = manifest.load_manifest(index_name)["files"]
+        entries = {}
+        for doc, doc_id in zip(docs, ids):
+            filename = doc.metadata.get("filename")
+            if filename is None:
+                continue
+            if filename not in entries:
+                known = known_files.get(filename, {})
+                entries[filename] = {
+                    "chunk_ids": manifest.load_chunk_ids(index_name, filename),
+                    "size": known.get("size"),
+                    "hash": known.get("hash"),
+                    "filetype": known.get("filetype") or doc.metadata.get("filetype")
+                }
+            entries[filename]["chunk_ids"].append(doc_id)
+        for entry in entries.values():
+            entry["chunk_ids"] = list(dict.fromkeys(entry["chunk_ids"]))
+        manifest.record_files(index_name, entries)
+        invalidate_answers(index_name)
+        invalidate_index_cache(index_name)
+        _log_embedding_cache_stats(cache_stats)
         logger.info(f"Documentos añadidos al índice {index_name}.")
         return True
     except Exception as e:
@@ -0,0 +1,669 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+import weakref
+from abc import ABC, abstractmethod
+
+import numpy as np
+from pinecone import Pinecone
+
+from storage import file_lock
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_VECTOR_DIR = os.getenv("LOCAL_VECTOR_DIR", os.path.join(".cache", "vectors"))
+
+# Tamaño de página al enumerar IDs (igual que Pinecone)
+LIST_PAGE_SIZE = 100
+
+
+class VectorBackend(ABC):
+    """
+    Interfaz común de los almacenes de vectores usados por `utils`.
+
+    Los resultados de `query` son dicts {"id", "score", "metadata", "values"} y
+    los de `fetch` dicts {id: {"values", "metadata"}}. Los filtros siguen la
+    sintaxis de metadatos de Pinecone ($eq, $ne, $in, $nin).
+
+    Las variantes asíncronas (`aquery`, `afetch`...) ejecutan por defecto la
+    operación síncrona en un hilo; los backends con cliente asíncrono propio
+    las sobrescriben.
+    """
+
+    name = None
+
+    @abstractmethod
+    def list_indexes(self) -> list:
+        """Lista los índices como dicts {"name", "host", "dimension", "metric", "status"}."""
+
+    @abstractmethod
+    def create_index(self, index_name: str, dimension: int, metric: str = "cosine"):
+        ...
+
+    @abstractmethod
+    def delete_index(self, index_name: str):
+        ...
+
+    @abstractmethod
+    def upsert(self, index_name: str, ids: list, vectors: list, metadatas: list):
+        ...
+
+    @abstractmethod
+    def query(self, index_name: str, vector, k: int, filter: dict = None, include_values: bool = False) -> list:
+        ...
+
+    @abstractmethod
+    def fetch(self, index_name: str, ids: list) -> dict:
+        ...
+
+    @abstractmethod
+    def list_ids(self, index_name: str, prefix: str = None):
+        """Genera páginas (listas) de IDs del índice, opcionalmente con un prefijo."""
+
+    @abstractmethod
+    def delete(self, index_name: str, ids: list = None, filter: dict = None):
+        ...
+
+    @abstractmethod
+    def describe_index_stats(self, index_name: str) -> dict:
+        """Devuelve {"vector_count", "dimension", "namespaces": {namespace: número de vectores}}."""
+
+    def invalidate(self, index_name: str):
+        """Descarta los recursos cacheados de un índice."""
+
+    async def alist_indexes(self) -> list:
+        return await asyncio.to_thread(self.list_indexes)
+
+    async def aupsert(self, index_name: str, ids: list, vectors: list, metadatas: list, **kwargs):
+        await asyncio.to_thread(self.upsert, index_name, ids, vectors, metadatas, **kwargs)
+
+    async def aquery(self, index_name: str, vector, k: int, filter: dict = None, include_values: bool = False) -> list:
+        return await asyncio.to_thread(self.query, index_name, vector, k, filter, include_values)
+
+    async def afetch(self, index_name: str, ids: list) -> dict:
+        return await asyncio.to_thread(self.fetch, index_name, ids)
+
+    async def adelete(self, index_name: str, ids: list = None, filter: dict = None):
+        await asyncio.to_thread(self.delete, index_name, ids, filter)
+
+    async def adescribe_index_stats(self, index_name: str) -> dict:
+        return await asyncio.to_thread(self.describe_index_stats, index_name)
+
+
+class PineconeBackend(VectorBackend):
+    """
+    Backend sobre Pinecone. Reutiliza un único cliente y un handle por índice
+    para todas las sesiones del proceso.
+
+    Las variantes asíncronas usan el cliente asyncio de Pinecone, con un handle
+    por índice y bucle de eventos (sus sesiones HTTP no se pueden compartir
+    entre bucles).
+    """
+
+    name = "pinecone"
+
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key or os.environ.get("PINECONE_API_KEY")
+        self._client = None
+        self._indexes = {}
+        self._hosts = {}
+        self._async_indexes = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = Pinecone(api_key=self.api_key)
+            return self._client
+
+    def index(self, index_name: str):
+        client = self.client
+        with self._lock:
+            if index_name not in self._indexes:
+                self._indexes[index_name] = client.Index(index_name)
+            return self._indexes[index_name]
+
+    def _host(self, index_name: str) -> str:
+        with self._lock:
+            if index_name in self._hosts:
+                return self._hosts[index_name]
+        host = self.client.describe_index(index_name).host
+        with self._lock:
+            return self._hosts.setdefault(index_name, host)
+
+    async def async_index(self, index_name: str):
+        """
+        Devuelve el handle asíncrono del índice para el bucle de eventos en curso.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            index = self._async_indexes.get(loop, {}).get(index_name)
+        if index is not None:
+            return index
+
+        # La primera vez hay que consultar el host del índice (llamada síncrona)
+        host = await asyncio.to_thread(self._host, index_name)
+        client = self.client
+        with self._lock:
+            indexes = self._async_indexes.setdefault(loop, {})
+            if index_name not in indexes:
+                indexes[index_name] = client.IndexAsyncio(host=host)
+            return indexes[index_name]
+
+    def invalidate(self, index_name: str):
+        with self._lock:
+            self._indexes.pop(index_name, None)
+            self._hosts.pop(index_name, None)
+            for indexes in self._async_indexes.values():
+                indexes.pop(index_name, None)
+
+    @staticmethod
+    def _index_info(idx) -> dict:
+        return {
+            "name": idx.name,
+            "host": getattr(idx, "host", "N/A"),
+            "dimension": getattr(idx, "dimension", "N/A"),
+            "metric": getattr(idx, "metric", "N/A"),
+            "status": getattr(idx, "status", "N/A")
+        }
+
+    @staticmethod
+    def _matches(response, include_values: bool) -> list:
+        return [
+            {
+                "id": match.id,
+                "score": match.score,
+                "metadata": dict(match.metadata or {}),
+                "values": list(match.values) if include_values else None
+            }
+            for match in response.matches
+        ]
+
+    @staticmethod
+    def _vectors(response) -> dict:
+        return {
+            doc_id: {"values": list(vector.values), "metadata": dict(vector.metadata or {})}
+            for doc_id, vector in response.vectors.items()
+        }
+
+    @staticmethod
+    def _stats(response) -> dict:
+        return {
+            "vector_count": response.total_vector_count,
+            "dimension": response.dimension,
+            "namespaces": {name: summary.vector_count for name, summary in (response.namespaces or {}).items()}
+        }
+
+    def list_indexes(self) -> list:
+        return [self._index_info(idx) for idx in self.client.list_indexes()]
+
+    def create_index(self, index_name: str, dimension: int, metric: str = "cosine"):
+        self.client.create_index(
+            name=index_name,
+            dimension=dimension,
+            metric=metric,
+            spec={
+                "serverless": {
+                    "cloud": "aws",
+                    "region": "us-east-1"
+                }
+            }
+        )
+
+    def delete_index(self, index_name: str):
+        self.client.delete_index(index_name)
+        self.invalidate(index_name)
+
+    def upsert(self, index_name: str, ids: list, vectors: list, metadatas: list, batch_size: int = 32):
+        self.index(index_name).upsert(
+            vectors=[
+                {"id": doc_id, "values": list(vector), "metadata": metadata}
+                for doc_id, vector, metadata in zip(ids, vectors, metadatas)
+            ],
+            batch_size=batch_size
+        )
+
+    def query(self, index_name: str, vector, k: int, filter: dict = None, include_values: bool = False) -> list:
+        response = self.index(index_name).query(
+            vector=list(vector),
+            top_k=k,
+            filter=filter,
+            include_metadata=True,
+            include_values=include_values
+        )
+        return self._matches(response, include_values)
+
+    def fetch(self, index_name: str, ids: list) -> dict:
+        return self._vectors(self.index(index_name).fetch(ids=list(ids)))
+
+    def list_ids(self, index_name: str, prefix: str = None):
+        kwargs = {"prefix": prefix} if prefix else {}
+        for ids in self.index(index_name).list(**kwargs):
+            yield list(ids)
+
+    def delete(self, index_name: str, ids: list = None, filter: dict = None):
+        index = self.index(index_name)
+        if ids:
+            for i in range(0, len(ids), 1000):
+                index.delete(ids=ids[i:i + 1000])
+        if filter:
+            index.delete(filter=filter)
+
+    def describe_index_stats(self, index_name: str) -> dict:
+        return self._stats(self.index(index_name).describe_index_stats())
+
+    async def aupsert(self, index_name: str, ids: list, vectors: list, metadatas: list, batch_size: int = 32):
+        index = await self.async_index(index_name)
+        await index.upsert(
+            vectors=[
+                {"id": doc_id, "values": list(vector), "metadata": metadata}
+                for doc_id, vector, metadata in zip(ids, vectors, metadatas)
+            ],
+            batch_size=batch_size,
+            show_progress=False
+        )
+
+    async def aquery(self, index_name: str, vector, k: int, filter: dict = None, include_values: bool = False) -> list:
+        index = await self.async_index(index_name)
+        response = await index.query(
+            vector=list(vector),
+            top_k=k,
+            filter=filter,
+            include_metadata=True,
+            include_values=include_values
+        )
+        return self._matches(response, include_values)
+
+    async def afetch(self, index_name: str, ids: list) -> dict:
+        index = await self.async_index(index_name)
+        return self._vectors(await index.fetch(ids=list(ids)))
+
+    async def adelete(self, index_name: str, ids: list = None, filter: dict = None):
+        index = await self.async_index(index_name)
+        if ids:
+            await asyncio.gather(*(index.delete(ids=ids[i:i + 1000]) for i in range(0, len(ids), 1000)))
+        if filter:
+            await index.delete(filter=filter)
+
+    async def adescribe_index_stats(self, index_name: str) -> dict:
+        index = await self.async_index(index_name)
+        return self._stats(await index.describe_index_stats())
+
+
+def _matches_condition(column: np.ndarray, condition) -> np.ndarray:
+    if not isinstance(condition, dict):
+        condition = {"$eq": condition}
+
+    mask = np.ones(len(column), dtype=bool)
+    for operator, value in condition.items():
+        if operator == "$eq":
+            mask &= column == value
+        elif operator == "$ne":
+            mask &= column != value
+        elif operator == "$in":
+            mask &= np.isin(column, list(value))
+        elif operator == "$nin":
+            mask &= ~np.isin(column, list(value))
+        else:
+            raise ValueError(f"Operador de filtro no soportado: {operator}")
+    return mask
+
+
+class LocalIndex:
+    """
+    Índice local en disco.
+
+    - `vectors.f32`: matriz float32 (filas normalizadas) de solo anexado, leída con memmap.
+    - `metadata.jsonl`: un registro {"id", "metadata"} por fila.
+    - `deleted.txt`: filas borradas (lápidas).
+
+    Reescribir un ID añade una fila nueva y marca la anterior como borrada;
+    `compact()` elimina físicamente las filas borradas.
+
+    Varios procesos (la aplicación y `ingest_cli`) pueden compartir el índice:
+    las escrituras se hacen bajo un bloqueo de archivo (`.lock`) y, antes de
+    leer o escribir, el índice se recarga si otro proceso ha cambiado los archivos.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+            info = json.load(f)
+        self.dimension = info["dimension"]
+        self.metric = info["metric"]
+        self._load()
+
+    @classmethod
+    def create(cls, path: str, dimension: int, metric: str = "cosine"):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "index.json"), "w", encoding="utf-8") as f:
+            json.dump({"dimension": dimension, "metric": metric}, f)
+        for filename in ("vectors.f32", "metadata.jsonl", "deleted.txt"):
+            open(os.path.join(path, filename), "a").close()
+        return cls(path)
+
+    def _file(self, filename: str) -> str:
+        return os.path.join(self.path, filename)
+
+    def _signature(self) -> tuple:
+        # Identidad y tamaño de los archivos: cambian con cada escritura o compactación
+        signature = []
+        for filename in ("vectors.f32", "metadata.jsonl", "deleted.txt"):
+            stat = os.stat(self._file(filename))
+            signature.append((stat.st_ino, stat.st_size))
+        return tuple(signature)
+
+    def _refresh(self):
+        """
+        Recarga el índice si otro proceso lo ha modificado. Se llama con el
+        bloqueo de archivo tomado.
+        """
+        if self._signature() != self._loaded_signature:
+            self._load()
+
+    def _read_refresh(self):
+        # Lecturas: bloqueo compartido para no recargar en mitad de una compactación ajena
+        if self._signature() != self._loaded_signature:
+            with file_lock(self._file(".lock"), shared=True):
+                self._refresh()
+
+    def _load(self):
+        self._loaded_signature = self._signature()
+        self._ids = []
+        self._metadata = []
+        with open(self._file("metadata.jsonl"), "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    # Registro a medio escribir
+                    break
+                record = json.loads(line)
+                self._ids.append(record["id"])
+                self._metadata.append(record["metadata"])
+
+        # Recortar filas a medio escribir (p. ej. tras una interrupción)
+        rows = min(len(self._ids), os.path.getsize(self._file("vectors.f32")) // (4 * self.dimension))
+        self._ids = self._ids[:rows]
+        self._metadata = self._metadata[:rows]
+
+        self._alive = np.ones(rows, dtype=bool)
+        with open(self._file("deleted.txt"), "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                row = int(line)
+                if row < rows:
+                    self._alive[row] = False
+
+        self._row_by_id = {}
+        for row, doc_id in enumerate(self._ids):
+            if self._alive[row]:
+                previous = self._row_by_id.get(doc_id)
+                if previous is not None:
+                    self._alive[previous] = False
+                self._row_by_id[doc_id] = row
+
+        self._columns = {}
+        self._open_matrix()
+
+    def _open_matrix(self):
+        rows = len(self._ids)
+        if rows:
+            self._matrix = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r",
+                                     shape=(rows, self.dimension))
+        else:
+            self._matrix = np.zeros((0, self.dimension), dtype=np.float32)
+
+    def _column(self, field: str) -> np.ndarray:
+        # Columna de metadatos como array para filtrar de forma vectorizada
+        if field not in self._columns:
+            column = np.empty(len(self._metadata), dtype=object)
+            column[:] = [metadata.get(field) for metadata in self._metadata]
+            self._columns[field] = column
+        return self._columns[field]
+
+    def _filter_mask(self, filter: dict = None) -> np.ndarray:
+        mask = self._alive.copy()
+        for field, condition in (filter or {}).items():
+            if field == "$and":
+                for sub_filter in condition:
+                    mask &= self._filter_mask(sub_filter)
+            else:
+                mask &= _matches_condition(self._column(field), condition)
+        return mask
+
+    def _mark_deleted(self, rows: list):
+        if not rows:
+            return
+        self._alive[rows] = False
+        with open(self._file("deleted.txt"), "a", encoding="utf-8") as f:
+            f.writelines(f"{row}\n" for row in rows)
+
+    def upsert(self, ids: list, vectors: list, metadatas: list):
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dimension)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        # IDs repetidos en el mismo lote: gana el último, como en Pinecone
+        last_row = {doc_id: i for i, doc_id in enumerate(ids)}
+        if len(last_row) < len(ids):
+            keep = sorted(last_row.values())
+            ids = [ids[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            matrix = matrix[keep]
+
+        with self._lock, file_lock(self._file(".lock")):
+            # Las filas nuevas se numeran a partir de lo que hay en disco
+            self._refresh()
+            replaced = [self._row_by_id[doc_id] for doc_id in ids if doc_id in self._row_by_id]
+            self._mark_deleted(replaced)
+
+            start = len(self._ids)
+            with open(self._file("vectors.f32"), "ab") as f:
+                f.write(matrix.tobytes())
+            with open(self._file("metadata.jsonl"), "a", encoding="utf-8") as f:
+                f.writelines(json.dumps({"id": doc_id, "metadata": metadata}, ensure_ascii=False) + "\n"
+                             for doc_id, metadata in zip(ids, metadatas))
+
+            self._ids.extend(ids)
+            self._metadata.extend(metadatas)
+            self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+            for offset, doc_id in enumerate(ids):
+                self._row_by_id[doc_id] = start + offset
+            self._columns = {}
+            self._open_matrix()
+            self._loaded_signature = self._signature()
+
+    def query(self, vector, k: int, filter: dict = None, include_values: bool = False) -> list:
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        with self._lock:
+            self._read_refresh()
+            candidates = np.flatnonzero(self._filter_mask(filter))
+            if not len(candidates) or k <= 0:
+                return []
+            if len(candidates) * 4 > len(self._ids):
+                # Sin filtro selectivo: producto sobre la matriz mapeada, sin copiar filas
+                scores = (self._matrix @ query)[candidates]
+            else:
+                scores = self._matrix[candidates] @ query
+            k = min(k, len(candidates))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {
+                    "id": self._ids[candidates[i]],
+                    "score": float(scores[i]),
+                    "metadata": dict(self._metadata[candidates[i]]),
+                    "values": self._matrix[candidates[i]].tolist() if include_values else None
+                }
+                for i in top
+            ]
+
+    def fetch(self, ids: list) -> dict:
+        with self._lock:
+            self._read_refresh()
+            return {
+                doc_id: {"values": self._matrix[row].tolist(), "metadata": dict(self._metadata[row])}
+                for doc_id in ids
+                if (row := self._row_by_id.get(doc_id)) is not None
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._read_refresh()
+            count = len(self._row_by_id)
+        return {"vector_count": count, "dimension": self.dimension, "namespaces": {"": count}}
+
+    def list_ids(self, prefix: str = None) -> list:
+        with self._lock:
+            self._read_refresh()
+            return [doc_id for doc_id in self._row_by_id if not prefix or doc_id.startswith(prefix)]
+
+    def delete(self, ids: list = None, filter: dict = None):
+        with self._lock, file_lock(self._file(".lock")):
+            self._refresh()
+            rows = [self._row_by_id.pop(doc_id) for doc_id in ids or [] if doc_id in self._row_by_id]
+            if filter:
+                filtered = np.flatnonzero(self._filter_mask(filter)).tolist()
+                for row in filtered:
+                    self._row_by_id.pop(self._ids[row], None)
+                rows.extend(filtered)
+            self._mark_deleted(rows)
+            self._loaded_signature = self._signature()
+
+            # Compactar cuando las filas borradas superan a las vivas
+            if len(self._ids) > 1000 and np.count_nonzero(~self._alive) > np.count_nonzero(self._alive):
+                self._compact()
+
+    def compact(self):
+        """
+        Reescribe el índice sin las filas borradas.
+        """
+        with self._lock, file_lock(self._file(".lock")):
+            self._refresh()
+            self._compact()
+
+    def _compact(self):
+        # Con los bloqueos de hilo y de archivo tomados
+        alive_rows = np.flatnonzero(self._alive)
+        matrix = np.asarray(self._matrix[alive_rows])
+        ids = [self._ids[row] for row in alive_rows]
+        metadatas = [self._metadata[row] for row in alive_rows]
+
+        with open(self._file("vectors.f32.tmp"), "wb") as f:
+            f.write(matrix.tobytes())
+        with open(self._file("metadata.jsonl.tmp"), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps({"id": doc_id, "metadata": metadata}, ensure_ascii=False) + "\n"
+                         for doc_id, metadata in zip(ids, metadatas))
+
+        self._matrix = None
+        os.replace(self._file("vectors.f32.tmp"), self._file("vectors.f32"))
+        os.replace(self._file("metadata.jsonl.tmp"), self._file("metadata.jsonl"))
+        open(self._file("deleted.txt"), "w").close()
+        self._load()
+        logger.info(f"Índice local {self.path} compactado ({len(ids)} vectores)")
+
+    def count(self) -> int:
+        with self._lock:
+            self._read_refresh()
+            return len(self._row_by_id)
+
+
+class LocalBackend(VectorBackend):
+    """
+    Backend local en disco: vectores float32 en memoria mapeada con metadatos
+    en un fichero JSONL, búsqueda coseno top-k vectorizada con NumPy y filtros
+    de metadatos. Pensado para uso sin conexión, CI y asistentes pequeños.
+    """
+
+    name = "local"
+
+    def __init__(self, root: str = LOCAL_VECTOR_DIR):
+        self.root = root
+        self._indexes = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def index(self, index_name: str) -> LocalIndex:
+        with self._lock:
+            if index_name not in self._indexes:
+                path = os.path.join(self.root, index_name)
+                if not os.path.exists(os.path.join(path, "index.json")):
+                    raise KeyError(f"El índice local {index_name} no existe")
+                self._indexes[index_name] = LocalIndex(path)
+            return self._indexes[index_name]
+
+    def invalidate(self, index_name: str):
+        with self._lock:
+            self._indexes.pop(index_name, None)
+
+    def list_indexes(self) -> list:
+        indexes = []
+        for name in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, name)
+            if os.path.exists(os.path.join(path, "index.json")):
+                with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+                    info = json.load(f)
+                indexes.append({
+                    "name": name,
+                    "host": path,
+                    "dimension": info["dimension"],
+                    "metric": info["metric"],
+                    "status": "Ready"
+                })
+        return indexes
+
+    def create_index(self, index_name: str, dimension: int, metric: str = "cosine"):
+        if metric != "cosine":
+            raise ValueError("El backend local solo admite la métrica coseno")
+        with self._lock:
+            self._indexes[index_name] = LocalIndex.create(os.path.join(self.root, index_name), dimension, metric)
+
+    def delete_index(self, index_name: str):
+        self.invalidate(index_name)
+        shutil.rmtree(os.path.join(self.root, index_name), ignore_errors=True)
+
+    def upsert(self, index_name: str, ids: list, vectors: list, metadatas: list, **kwargs):
+        self.index(index_name).upsert(ids, vectors, metadatas)
+
+    def query(self, index_name: str, vector, k: int, filter: dict = None, include_values: bool = False) -> list:
+        return self.index(index_name).query(vector, k, filter=filter, include_values=include_values)
+
+    def fetch(self, index_name: str, ids: list) -> dict:
+        return self.index(index_name).fetch(ids)
+
+    def list_ids(self, index_name: str, prefix: str = None):
+        ids = self.index(index_name).list_ids(prefix)
+        for i in range(0, len(ids), LIST_PAGE_SIZE):
+            yield ids[i:i + LIST_PAGE_SIZE]
+
+    def delete(self, index_name: str, ids: list = None, filter: dict = None):
+        self.index(index_name).delete(ids=ids, filter=filter)
+
+    def describe_index_stats(self, index_name: str) -> dict:
+        return self.index(index_name).stats()
+
+
+BACKENDS = {
+    PineconeBackend.name: PineconeBackend,
+    LocalBackend.name: LocalBackend,
+}
+
+
+def create_backend(name: str = VECTOR_BACKEND) -> VectorBackend:
+    """
+    Crea el backend configurado ("pinecone" o "local").
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de vectores desconocido: {name}. Opciones: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()